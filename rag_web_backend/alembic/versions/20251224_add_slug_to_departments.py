@@ -25,14 +25,35 @@ def upgrade() -> None:
     
     # 為現有的部門生成 slug 值
     # 使用 name 的小寫版本作為臨時 slug
-    op.execute("""
-        UPDATE departments 
-        SET slug = LOWER(REPLACE(name, ' ', '-'))
-        WHERE slug IS NULL
-    """)
+    # 分批更新並在批次間提交，避免單一大交易長時間持有列鎖、暴增 WAL
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        while True:
+            result = bind.exec_driver_sql("""
+                UPDATE departments d
+                SET slug = LOWER(REPLACE(d.name, ' ', '-'))
+                FROM (
+                    SELECT id FROM departments
+                    WHERE slug IS NULL
+                    LIMIT 500
+                    FOR UPDATE SKIP LOCKED
+                ) AS batch
+                WHERE d.id = batch.id
+            """)
+            if result.rowcount == 0:
+                break
     
     # 將 slug 欄位改為 NOT NULL
+    # 直接 SET NOT NULL 會在 ACCESS EXCLUSIVE 鎖下全表掃描驗證，
+    # 先加 NOT VALID 的 CHECK 約束再 VALIDATE（只需 SHARE UPDATE EXCLUSIVE 鎖），
+    # 之後的 SET NOT NULL 可利用已驗證的約束跳過掃描（PostgreSQL 12+）
+    op.execute(
+        "ALTER TABLE departments "
+        "ADD CONSTRAINT departments_slug_not_null CHECK (slug IS NOT NULL) NOT VALID"
+    )
+    op.execute("ALTER TABLE departments VALIDATE CONSTRAINT departments_slug_not_null")
     op.alter_column('departments', 'slug', nullable=False)
+    op.execute("ALTER TABLE departments DROP CONSTRAINT departments_slug_not_null")
     
     # 添加唯一索引
     op.create_index(op.f('ix_departments_slug'), 'departments', ['slug'], unique=True)
@@ -0,0 +1,68 @@
+"""add covering indexes for user uniqueness pre-checks
+
+Revision ID: 20260115_user_lookup_idx
+Revises: 20251224_add_slug
+Create Date: 2026-01-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20260115_user_lookup_idx'
+down_revision: Union[str, Sequence[str], None] = '20251224_add_slug'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _swap_index(name: str, column: str, include: str) -> None:
+    """以 CONCURRENTLY 建立 covering index 後替換舊索引
+
+    先用暫時名稱建立新索引，再移除舊索引並改名，
+    整個過程唯一性約束都持續生效。
+    """
+    op.create_index(
+        f'{name}_covering',
+        'users',
+        [column],
+        unique=True,
+        postgresql_include=[include],
+        postgresql_concurrently=True
+    )
+    op.drop_index(name, table_name='users', postgresql_concurrently=True)
+    op.execute(f'ALTER INDEX {name}_covering RENAME TO {name}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 重建 username / email 唯一索引為 covering index（INCLUDE 另一欄位）
+    # 讓建立使用者前的唯一性檢查（username OR email）可以走 index-only scan，
+    # 不需要回表讀取 heap page
+    #
+    # CREATE / DROP INDEX CONCURRENTLY 不能在交易內執行，
+    # 使用 autocommit_block 避免建索引期間鎖住整張表阻擋寫入
+    with op.get_context().autocommit_block():
+        _swap_index(op.f('ix_users_username'), 'username', include='email')
+        _swap_index(op.f('ix_users_email'), 'email', include='username')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 恢復為不含 INCLUDE 欄位的一般唯一索引
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_email_plain', 'users', ['email'],
+            unique=True, postgresql_concurrently=True
+        )
+        op.drop_index(op.f('ix_users_email'), table_name='users', postgresql_concurrently=True)
+        op.execute(f"ALTER INDEX ix_users_email_plain RENAME TO {op.f('ix_users_email')}")
+
+        op.create_index(
+            'ix_users_username_plain', 'users', ['username'],
+            unique=True, postgresql_concurrently=True
+        )
+        op.drop_index(op.f('ix_users_username'), table_name='users', postgresql_concurrently=True)
+        op.execute(f"ALTER INDEX ix_users_username_plain RENAME TO {op.f('ix_users_username')}")
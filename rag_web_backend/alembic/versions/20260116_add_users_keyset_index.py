@@ -0,0 +1,38 @@
+"""add composite index for users keyset pagination
+
+Revision ID: 20260116_users_keyset_idx
+Revises: 20260115_user_lookup_idx
+Create Date: 2026-01-16 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20260116_users_keyset_idx'
+down_revision: Union[str, Sequence[str], None] = '20260115_user_lookup_idx'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 使用者列表的 keyset 分頁以 (created_at DESC, id DESC) 為排序鍵，
+    # 建立對應的複合索引讓「WHERE (created_at, id) < (...) ORDER BY ... LIMIT」
+    # 可以直接沿索引掃描，不必排序也不必掃過前面所有頁
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_created_at_id',
+            'users',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_created_at_id', table_name='users', postgresql_concurrently=True)
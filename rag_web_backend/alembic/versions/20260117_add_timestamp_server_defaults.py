@@ -0,0 +1,47 @@
+"""add server-side defaults for created_at / updated_at
+
+Revision ID: 20260117_ts_server_default
+Revises: 20260116_users_keyset_idx
+Create Date: 2026-01-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20260117_ts_server_default'
+down_revision: Union[str, Sequence[str], None] = '20260116_users_keyset_idx'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 所有使用 TimestampMixin 的資料表
+_TABLES = (
+    'departments',
+    'users',
+    'categories',
+    'files',
+    'activities',
+    'query_history',
+    'faqs',
+    'system_settings',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 時間戳改由資料庫端 now() 填入（對應 TimestampMixin 的 server_default），
+    # INSERT 不再需要為每列傳送 Python 產生的 timestamp 參數。
+    # 只是設定欄位 DEFAULT，屬 metadata 變更，不重寫資料表
+    for table in _TABLES:
+        op.alter_column(table, 'created_at', server_default=sa.func.now())
+        op.alter_column(table, 'updated_at', server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in _TABLES:
+        op.alter_column(table, 'created_at', server_default=None)
+        op.alter_column(table, 'updated_at', server_default=None)
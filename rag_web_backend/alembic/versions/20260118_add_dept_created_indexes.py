@@ -0,0 +1,45 @@
+"""add composite (department_id, created_at DESC) indexes
+
+Revision ID: 20260118_dept_created_idx
+Revises: 20260117_ts_server_default
+Create Date: 2026-01-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20260118_dept_created_idx'
+down_revision: Union[str, Sequence[str], None] = '20260117_ts_server_default'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 資料表)：查詢歷史統計、檔案列表分頁、最近活動列表
+# 都以「處室 + 建立時間倒序」存取
+_INDEXES = (
+    ('ix_query_history_dept_created', 'query_history'),
+    ('ix_files_dept_created', 'files'),
+    ('ix_activities_dept_created', 'activities'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in _INDEXES:
+            op.create_index(
+                name,
+                table,
+                ['department_id', sa.text('created_at DESC')],
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in _INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
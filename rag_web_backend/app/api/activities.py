@@ -100,22 +100,7 @@ async def get_activities(
     activities = result.scalars().all()
     
     # 轉換為回應格式
-    items = []
-    for activity in activities:
-        items.append(ActivityListItem(
-            id=activity.id,
-            activity_type=activity.activity_type.value,
-            description=activity.description,
-            user_id=activity.user_id,
-            username=activity.user.username if activity.user else "未知",
-            user_full_name=activity.user.full_name if activity.user else "未知",
-            file_id=activity.file_id,
-            file_name=activity.file.original_filename if activity.file else None,
-            ip_address=activity.ip_address,
-            created_at=activity.created_at,
-            department_id=activity.department_id,
-            department_name=activity.department.name if activity.department else None
-        ))
+    items = [ActivityListItem.from_orm_row(activity) for activity in activities]
     
     return ActivityListResponse(
         items=items,
@@ -184,22 +169,7 @@ async def get_all_activities(
     activities = result.scalars().all()
     
     # 轉換為回應格式
-    items = []
-    for activity in activities:
-        items.append(ActivityListItem(
-            id=activity.id,
-            activity_type=activity.activity_type.value,
-            description=activity.description,
-            user_id=activity.user_id,
-            username=activity.user.username if activity.user else "未知",
-            user_full_name=activity.user.full_name if activity.user else "未知",
-            file_id=activity.file_id,
-            file_name=activity.file.original_filename if activity.file else None,
-            ip_address=activity.ip_address,
-            created_at=activity.created_at,
-            department_id=activity.department_id,
-            department_name=activity.department.name if activity.department else None
-        ))
+    items = [ActivityListItem.from_orm_row(activity) for activity in activities]
     
     return ActivityListResponse(
         items=items,
@@ -1,10 +1,11 @@
 """認證相關 API 路由"""
 
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
@@ -12,8 +13,9 @@ from app.core.security import (
     authenticate_user,
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    invalidate_user,
+    verify_password_async,
 )
 from app.models import User
 from app.schemas import (
@@ -29,38 +31,55 @@ from app.services.activity import activity_service
 router = APIRouter(prefix="/auth", tags=["認證"])
 
 
-@router.post("/login", summary="使用者登入")
-async def login(
-    login_data: LoginRequest,
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    使用者登入
-    
-    - **username**: 使用者名稱
-    - **password**: 密碼
-    
-    返回 JWT Token 和使用者資訊（前端期望格式）
+def _ensure_login_allowed(user: Optional[User]) -> User:
+    """檢查登入帳號狀態，集中管理各種失敗情況對應的錯誤訊息
+
+    Args:
+        user: authenticate_user 的結果（驗證失敗為 None）
+
+    Returns:
+        User: 通過檢查的使用者物件
+
+    Raises:
+        HTTPException: 帳號密碼錯誤或帳號已停用
     """
-    user = await authenticate_user(db, login_data.username, login_data.password)
-    
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="帳號或密碼錯誤",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="使用者帳號已停用"
         )
+
+    return user
+
+
+@router.post("/login", summary="使用者登入")
+async def login(
+    login_data: LoginRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    使用者登入
+    
+    - **username**: 使用者名稱
+    - **password**: 密碼
     
+    返回 JWT Token 和使用者資訊（前端期望格式）
+    """
+    user = _ensure_login_allowed(
+        await authenticate_user(db, login_data.username, login_data.password)
+    )
+
     # 建立 JWT Token
     access_token_expires = timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data={"sub": str(user.id), "uid": user.id},
         expires_delta=access_token_expires
     )
     
@@ -108,24 +127,13 @@ async def login_for_access_token(
     
     返回 JWT Access Token
     """
-    user = await authenticate_user(db, form_data.username, form_data.password)
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="帳號或密碼錯誤",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="使用者帳號已停用"
-        )
-    
+    user = _ensure_login_allowed(
+        await authenticate_user(db, form_data.username, form_data.password)
+    )
+
     access_token_expires = timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data={"sub": str(user.id), "uid": user.id},
         expires_delta=access_token_expires
     )
     
@@ -183,17 +191,23 @@ async def change_password(
     - **new_password**: 新密碼（至少 6 個字元）
     """
     # 驗證舊密碼
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="舊密碼錯誤"
         )
     
-    # 更新密碼
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.add(current_user)
+    # 更新密碼：
+    # current_user 是認證快取給出的唯讀複本（與快取原件共用 ORM 狀態），
+    # 直接改它再 db.add 不會產生任何 UPDATE，必須在本 session 重新取得該列
+    result = await db.execute(select(User).where(User.id == current_user.id))
+    db_user = result.scalar_one()
+    db_user.hashed_password = await get_password_hash_async(password_data.new_password)
     await db.commit()
-    
+
+    # 密碼已變更，使認證快取中的舊資料立即失效
+    invalidate_user(current_user.id)
+
     return MessageResponse(
         message="密碼修改成功",
         detail="請使用新密碼重新登入"
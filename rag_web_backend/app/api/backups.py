@@ -6,9 +6,7 @@ from datetime import datetime
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
 from app.core.security import require_role
 from app.models import User, UserRole
 
@@ -60,8 +58,7 @@ async def get_backup_history(
 
 @router.post("/create", summary="建立手動備份")
 async def create_backup(
-    current_user: User = Depends(require_role(UserRole.SUPER_ADMIN)),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_role(UserRole.SUPER_ADMIN))
 ):
     """
     建立手動備份（僅管理員）
@@ -94,8 +91,7 @@ async def create_backup(
 @router.post("/{backup_id}/restore", summary="還原備份")
 async def restore_backup(
     backup_id: int,
-    current_user: User = Depends(require_role(UserRole.SUPER_ADMIN)),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_role(UserRole.SUPER_ADMIN))
 ):
     """
     從備份還原系統（僅管理員）
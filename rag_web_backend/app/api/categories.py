@@ -2,7 +2,7 @@
 
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, literal
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
@@ -150,13 +150,14 @@ async def create_category(
     - 自動關聯到當前使用者的處室
     """
     # 檢查分類名稱是否重複（同處室內）
+    # SELECT 1 ... LIMIT 1 可由索引直接回答，不需載入整列資料
     existing = await db.execute(
-        select(Category).where(
+        select(literal(1)).where(
             Category.name == category_data.name,
             Category.department_id == current_user.department_id
-        )
+        ).limit(1)
     )
-    if existing.scalar_one_or_none():
+    if existing.first():
         raise HTTPException(status_code=400, detail="分類名稱已存在")
     
     # 建立分類
@@ -168,8 +169,7 @@ async def create_category(
     
     db.add(category)
     await db.commit()
-    await db.refresh(category)
-    
+
     # 記錄活動 (包含處室 ID)
     await activity_service.log_activity(
         db=db,
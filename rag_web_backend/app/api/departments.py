@@ -1,14 +1,16 @@
 """處室管理 API 路由"""
 
+import asyncio
 import math
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select, desc
+from sqlalchemy import func, select, desc, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.core.security import get_current_user, require_role
 from app.models import Activity, ActivityType, Category, Department, File, User, UserRole
 from app.schemas import (
@@ -24,6 +26,17 @@ from app.services.activity import activity_service
 router = APIRouter(prefix="/departments", tags=["處室管理"])
 
 
+async def _counts_by_department(dept_id_col, dept_ids: list[int]) -> dict[int, int]:
+    """以獨立 session 統計各處室的筆數（供與其他統計並行執行）"""
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(dept_id_col, func.count())
+            .where(dept_id_col.in_(dept_ids))
+            .group_by(dept_id_col)
+        )
+        return dict(rows.all())
+
+
 @router.get("/", response_model=DepartmentListResponse, summary="取得處室列表")
 async def list_departments(
     page: int = Query(1, ge=1, description="頁碼"),
@@ -64,18 +77,22 @@ async def list_departments(
     departments = result.scalars().all()
     
     # 為每個處室添加統計資訊
+    # 兩條 GROUP BY 統計取代逐處室各兩次 COUNT 的 2N 次往返，
+    # 且使用者數與檔案數互相獨立，用兩條連線並行查詢
+    dept_ids = [dept.id for dept in departments]
+    user_counts: dict[int, int] = {}
+    file_counts: dict[int, int] = {}
+    if dept_ids:
+        user_counts, file_counts = await asyncio.gather(
+            _counts_by_department(User.department_id, dept_ids),
+            _counts_by_department(File.department_id, dept_ids),
+        )
+
     dept_list = []
     for dept in departments:
-        # 計算使用者數量
-        user_count = await db.scalar(
-            select(func.count()).where(User.department_id == dept.id)
-        ) or 0
-        
-        # 計算檔案數量
-        file_count = await db.scalar(
-            select(func.count()).where(File.department_id == dept.id)
-        ) or 0
-        
+        user_count = user_counts.get(dept.id, 0)
+        file_count = file_counts.get(dept.id, 0)
+
         # 創建響應物件
         dept_dict = {
             "id": dept.id,
@@ -142,16 +159,14 @@ async def get_department_by_slug(
             detail="處室不存在"
         )
 
-    # 計算使用者數量
-    user_count = await db.scalar(
-        select(func.count()).where(User.department_id == department.id)
-    ) or 0
-    
-    # 計算檔案數量
-    file_count = await db.scalar(
-        select(func.count()).where(File.department_id == department.id)
-    ) or 0
-    
+    # 使用者數與檔案數互相獨立，用兩條連線並行查詢
+    user_counts, file_counts = await asyncio.gather(
+        _counts_by_department(User.department_id, [department.id]),
+        _counts_by_department(File.department_id, [department.id]),
+    )
+    user_count = user_counts.get(department.id, 0)
+    file_count = file_counts.get(department.id, 0)
+
     # 返回完整資訊
     return {
         "id": department.id,
@@ -188,49 +203,63 @@ async def create_department(
     - **description**: 處室描述（可選）
     - **color**: 主題顏色（選填，預設藍色）
     """
-    # 檢查名稱是否已存在
-    result = await db.execute(select(Department).where(Department.name == department_data.name))
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="處室名稱已存在"
-        )
-    
-    # 檢查 slug 是否已存在
-    result = await db.execute(select(Department).where(Department.slug == department_data.slug))
-    if result.scalar_one_or_none():
+    # 直接 INSERT 並以唯一索引擋重複：
+    # 取代「先 SELECT 檢查再 INSERT」的兩段式寫法，
+    # 少兩次往返，且在並發建立時也不會產生重複資料
+    stmt = (
+        pg_insert(Department)
+        .values(**department_data.model_dump())
+        .on_conflict_do_nothing()
+        .returning(Department.id, Department.created_at, Department.updated_at)
+    )
+    row = (await db.execute(stmt)).first()
+
+    if row is None:
+        # 撞到唯一約束，補查一次是名稱還是 slug 衝突（只在失敗路徑付出成本）
+        name_taken = (await db.execute(
+            select(literal(1)).where(Department.name == department_data.name).limit(1)
+        )).first()
+        if name_taken:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="處室名稱已存在"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"URL 識別碼 '{department_data.slug}' 已被使用"
         )
-    
-    # 建立處室
-    department = Department(**department_data.model_dump())
-    db.add(department)
-    await db.flush()  # 先 flush 以取得 department.id
-    
+
     # 自動建立"其他"分類
     default_category = Category(
         name="其他",
         description="不屬於以上任一分類的檔案",
         color="#6B7280",  # 灰色
-        department_id=department.id
+        department_id=row.id
     )
     db.add(default_category)
-    
+
     # 記錄活動
     await activity_service.log_activity(
         db=db,
         user_id=current_user.id,
         activity_type="CREATE_DEPARTMENT",
-        description=f"建立處室: {department.name}",
-        department_id=department.id
+        description=f"建立處室: {department_data.name}",
+        department_id=row.id
     )
-    
+
     await db.commit()
-    await db.refresh(department)
-    
-    return department
+
+    return {
+        "id": row.id,
+        "name": department_data.name,
+        "slug": department_data.slug,
+        "description": department_data.description,
+        "color": department_data.color,
+        "user_count": 0,
+        "file_count": 0,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
 
 
 @router.put(
@@ -267,12 +296,12 @@ async def update_department(
     # 檢查名稱是否與其他處室重複
     if department_data.name and department_data.name != department.name:
         result = await db.execute(
-            select(Department).where(
+            select(literal(1)).where(
                 Department.name == department_data.name,
                 Department.id != department_id
-            )
+            ).limit(1)
         )
-        if result.scalar_one_or_none():
+        if result.first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="處室名稱已被使用"
@@ -292,9 +321,9 @@ async def update_department(
         department_id=department.id
     )
     
+    # expire_on_commit=False：commit 後屬性仍有效，不需 refresh 重查一次
     await db.commit()
-    await db.refresh(department)
-    
+
     return department
 
 
@@ -2,8 +2,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, bindparam
 
+from app.api.public import invalidate_faq_cache
 from app.core.database import get_db
 from app.core.security import get_current_user, require_role
 from app.models.user import User, UserRole
@@ -88,8 +89,8 @@ async def create_faq(
     faq = FAQ(**faq_dict)
     db.add(faq)
     await db.commit()
-    await db.refresh(faq)
-    
+    invalidate_faq_cache(faq.department_id)
+
     return {
         "success": True,
         "message": "FAQ 創建成功",
@@ -140,10 +141,10 @@ async def update_faq(
     update_data = faq_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(faq, field, value)
-    
+
     await db.commit()
-    await db.refresh(faq)
-    
+    invalidate_faq_cache(faq.department_id)
+
     return {
         "success": True,
         "message": "FAQ 更新成功",
@@ -167,9 +168,11 @@ async def delete_faq(
         if faq.department_id != current_user.department_id:
             raise HTTPException(status_code=403, detail="無權刪除此 FAQ")
     
+    department_id = faq.department_id
     await db.delete(faq)
     await db.commit()
-    
+    invalidate_faq_cache(department_id)
+
     return {
         "success": True,
         "message": "FAQ 刪除成功"
@@ -184,19 +187,31 @@ async def toggle_faq_status(
     current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.SUPER_ADMIN))
 ):
     """切換 FAQ 啟用狀態"""
-    faq = await db.get(FAQ, faq_id)
-    if not faq:
-        raise HTTPException(status_code=404, detail="FAQ 不存在")
-    
+    # 單一 UPDATE ... RETURNING 取代「SELECT 再修改再 commit」：
+    # 一次往返完成狀態切換並取回整列，權限檢查直接放進 WHERE
+    stmt = (
+        update(FAQ)
+        .where(FAQ.id == faq_id)
+        .values(is_active=toggle_data.is_active)
+        .returning(FAQ)
+    )
     # 權限檢查：只能修改自己處室的 FAQ
     if current_user.role != UserRole.SUPER_ADMIN:
-        if faq.department_id != current_user.department_id:
-            raise HTTPException(status_code=403, detail="無權修改此 FAQ")
-    
-    faq.is_active = toggle_data.is_active
+        stmt = stmt.where(FAQ.department_id == current_user.department_id)
+
+    faq = (await db.execute(stmt)).scalar_one_or_none()
+
+    if faq is None:
+        # 只在失敗路徑補查一次，分辨是不存在還是無權限
+        await db.rollback()
+        dept_id = await db.scalar(select(FAQ.department_id).where(FAQ.id == faq_id))
+        if dept_id is None:
+            raise HTTPException(status_code=404, detail="FAQ 不存在")
+        raise HTTPException(status_code=403, detail="無權修改此 FAQ")
+
     await db.commit()
-    await db.refresh(faq)
-    
+    invalidate_faq_cache(faq.department_id)
+
     return {
         "success": True,
         "message": f"FAQ 已{'啟用' if toggle_data.is_active else '停用'}",
@@ -211,19 +226,29 @@ async def reorder_faqs(
     current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.SUPER_ADMIN))
 ):
     """重新排序 FAQ"""
-    # 更新每個 FAQ 的 order 欄位
-    for index, faq_id in enumerate(reorder_data.faq_ids):
-        faq = await db.get(FAQ, faq_id)
-        if faq:
-            # 權限檢查：只能排序自己處室的 FAQ
-            if current_user.role != UserRole.SUPER_ADMIN:
-                if faq.department_id != current_user.department_id:
-                    continue
-            
-            faq.order = index
-    
-    await db.commit()
-    
+    if reorder_data.faq_ids:
+        # 一次 executemany UPDATE 更新所有 order 欄位，
+        # 取代逐筆 db.get + 修改的 N 次往返
+        stmt = (
+            update(FAQ)
+            .where(FAQ.id == bindparam("faq_id"))
+            .values(order=bindparam("new_order"))
+        )
+        # 權限檢查：只能排序自己處室的 FAQ
+        if current_user.role != UserRole.SUPER_ADMIN:
+            stmt = stmt.where(FAQ.department_id == current_user.department_id)
+
+        await db.execute(
+            stmt,
+            [
+                {"faq_id": faq_id, "new_order": index}
+                for index, faq_id in enumerate(reorder_data.faq_ids)
+            ],
+            execution_options={"synchronize_session": False}
+        )
+        await db.commit()
+    invalidate_faq_cache(current_user.department_id)
+
     return {
         "success": True,
         "message": "FAQ 排序更新成功"
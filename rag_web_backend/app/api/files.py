@@ -1,5 +1,6 @@
 """檔案管理 API 路由"""
 
+import asyncio
 import os
 import math
 from datetime import datetime
@@ -14,12 +15,12 @@ from fastapi import (
     Form,
     Query
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from sqlalchemy import select, func, or_, desc, asc
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.core.security import get_current_user, get_current_active_admin
 from app.models.user import User
 from app.models.file import File as FileModel
@@ -34,12 +35,21 @@ from app.schemas.file import (
 )
 from app.services.file_storage import file_storage
 from app.services.activity import activity_service
+from app.services.rag.engine_cache import invalidate_engine
+from app.services.rag.query_cache import invalidate_query_cache
 from app.models.file import FileStatus as ProcessingStatus
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
-@router.get("/", response_model=FileListResponse)
+async def _count_files(conds: list) -> int:
+    """以獨立 session 計算符合條件的檔案總數（供與資料頁查詢並行執行）"""
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(func.count(FileModel.id)).where(*conds)) or 0
+
+
+# 列表頁可達上萬筆巢狀物件，改用 orjson 序列化省下可觀的 CPU
+@router.get("/", response_model=FileListResponse, response_class=ORJSONResponse)
 async def get_files(
     page: int = Query(1, ge=1, description="頁碼"),
     limit: int = Query(10, ge=1, le=10000, description="每頁數量"),
@@ -58,50 +68,64 @@ async def get_files(
     - 支援搜尋檔名和描述
     - 支援排序和分頁
     """
-    # 建立基礎查詢（自動過濾處室）
-    query = select(FileModel).where(
-        FileModel.department_id == current_user.department_id
-    ).options(
-        joinedload(FileModel.category),
-        joinedload(FileModel.uploader)
-    )
-    
+    # 篩選條件（自動過濾處室；資料頁與總數查詢共用）
+    conds = [FileModel.department_id == current_user.department_id]
+
     # 分類篩選
     if category_id:
-        query = query.where(FileModel.category_id == category_id)
-    
+        conds.append(FileModel.category_id == category_id)
+
     # 狀態篩選
     if status:
-        query = query.where(FileModel.status == status)
-    
+        conds.append(FileModel.status == status)
+
     # 搜尋
     if search:
         search_pattern = f"%{search}%"
-        query = query.where(
+        conds.append(
             or_(
                 FileModel.original_filename.ilike(search_pattern),
                 FileModel.description.ilike(search_pattern)
             )
         )
-    
-    # 計算總數
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await db.scalar(count_query)
-    
+
     # 排序
     sort_column = getattr(FileModel, sort)
     order_by = desc(sort_column) if order == "desc" else asc(sort_column)
-    query = query.order_by(order_by)
-    
+
+    # 依頁大小選擇關聯載入策略：
+    # 小頁 joinedload 一次往返最划算；
+    # 大頁改用 selectinload，避免 JOIN 對每一列重複傳輸分類與上傳者欄位
+    if limit <= 100:
+        load_opts = (joinedload(FileModel.category), joinedload(FileModel.uploader))
+    else:
+        load_opts = (selectinload(FileModel.category), selectinload(FileModel.uploader))
+
     # 分頁
-    query = query.offset((page - 1) * limit).limit(limit)
+    query = (
+        select(FileModel)
+        .where(*conds)
+        .options(*load_opts)
+        .order_by(order_by)
+        .offset((page - 1) * limit)
+        .limit(limit)
+    )
     
     # 執行查詢
-    result = await db.execute(query)
-    files = result.unique().scalars().all()
-    
+    # 總數與資料頁互相獨立，用兩條連線並行查詢，減少一次串行往返的等待。
+    # limit 最大可到 10000：用 server-side cursor 串流、yield_per 分批 hydrate，
+    # 峰值記憶體由 O(頁大小) 降為 O(批次大小)，且邊收資料邊組裝回應
+    total, result = await asyncio.gather(
+        _count_files(conds),
+        db.stream(query.execution_options(yield_per=50))
+    )
+
+    items = []
+    async for f in result.unique().scalars():
+        items.append(FileSchema.from_orm_row(f))
+
     return FileListResponse(
-        items=[FileSchema.model_validate(f) for f in files],
+        items=items,
         total=total,
         page=page,
         pages=math.ceil(total / limit) if total > 0 else 0
@@ -170,7 +194,7 @@ async def get_file_statistics(
         total_size=int(total_size),
         by_status=by_status,
         by_type=by_type,
-        recent_uploads=[FileSchema.model_validate(f) for f in recent_files]
+        recent_uploads=[FileSchema.from_orm_row(f) for f in recent_files]
     )
 
 
@@ -241,9 +265,9 @@ async def upload_file(
     )
     
     db.add(db_file)
+    # expire_on_commit=False：commit 後 id 與時間戳都已就緒，不需 refresh
     await db.commit()
-    await db.refresh(db_file)
-    
+
     # 6. 記錄活動
     await activity_service.log_activity(
         db=db,
@@ -259,8 +283,7 @@ async def upload_file(
     db_file.processing_step = "pending"
     db_file.processing_progress = 0
     await db.commit()
-    await db.refresh(db_file)
-    
+
     return FileUploadResponse(
         id=db_file.id,
         filename=db_file.filename,
@@ -359,8 +382,7 @@ async def batch_upload_files(
             
             db.add(db_file)
             await db.commit()
-            await db.refresh(db_file)
-            
+
             uploaded_file_ids.append(db_file.id)
             
             results.append({
@@ -572,7 +594,12 @@ async def delete_file(
     # 刪除資料庫記錄
     await db.delete(file)
     await db.commit()
-    
+
+    # 知識庫內容已變動，清除該處室的 RAG 查詢快取與引擎
+    # （引擎持有已載入的向量索引，不清除會繼續撈到已刪文件的片段）
+    invalidate_query_cache(department_id)
+    invalidate_engine(department_id)
+
     # 記錄活動（在刪除後，不關聯 file_id）
     cleanup_summary = f"刪除檔案: {original_filename}"
     if cleanup_stats['summary_files'] > 0 or cleanup_stats['embedding_files'] > 0:
@@ -1,6 +1,7 @@
 """公開 API 路由（無需認證）"""
 
 import os
+import time
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,6 +13,24 @@ from app.models.faq import FAQ
 
 router = APIRouter(prefix="", tags=["公開 API"])
 
+# FAQ 列表快取：首頁與聊天頁每次載入都會呼叫 /faq/list，
+# 以短 TTL 快取查詢結果，讓重複請求不再進資料庫
+_FAQ_CACHE_TTL = 60  # 秒
+_faq_cache: Dict[tuple, tuple] = {}  # (department_id, category) -> (到期時間, faq_list)
+
+
+def invalidate_faq_cache(department_id: Optional[int] = None) -> None:
+    """清除 FAQ 快取（FAQ 有異動時由管理端呼叫）
+
+    參數:
+        department_id: 只清除特定處室的快取，None 表示全部清除
+    """
+    if department_id is None:
+        _faq_cache.clear()
+        return
+    for key in [k for k in _faq_cache if k[0] == department_id]:
+        _faq_cache.pop(key, None)
+
 
 @router.get("/faq/list")
 async def get_faq_list(
@@ -33,37 +52,45 @@ async def get_faq_list(
     - 聊天頁快速問題：不傳 limit 獲取完整列表
     """
     try:
-        # 構建查詢 - 只返回指定處室的啟用 FAQ
-        query = select(FAQ).where(
-            FAQ.is_active == True,
-            FAQ.department_id == department_id
-        )
-        
-        # 如果有分類過濾
-        if category:
-            query = query.where(FAQ.category == category)
-        
-        # 按 order 排序
-        query = query.order_by(FAQ.order.asc(), FAQ.id.asc())
-        
-        # 執行查詢
-        result = await db.execute(query)
-        faqs = result.scalars().all()
-        
-        # 轉換為字典列表
-        faq_list = [
-            {
-                "id": faq.id,
-                "category": faq.category,
-                "question": faq.question,
-                "description": faq.description,
-                "answer": faq.answer,
-                "icon": faq.icon,
-                "order": faq.order
-            }
-            for faq in faqs
-        ]
-        
+        # 先查快取，命中則不進資料庫
+        cache_key = (department_id, category)
+        cached = _faq_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            faq_list = cached[1]
+        else:
+            # 構建查詢 - 只返回指定處室的啟用 FAQ
+            query = select(FAQ).where(
+                FAQ.is_active == True,
+                FAQ.department_id == department_id
+            )
+
+            # 如果有分類過濾
+            if category:
+                query = query.where(FAQ.category == category)
+
+            # 按 order 排序
+            query = query.order_by(FAQ.order.asc(), FAQ.id.asc())
+
+            # 執行查詢
+            result = await db.execute(query)
+            faqs = result.scalars().all()
+
+            # 轉換為字典列表
+            faq_list = [
+                {
+                    "id": faq.id,
+                    "category": faq.category,
+                    "question": faq.question,
+                    "description": faq.description,
+                    "answer": faq.answer,
+                    "icon": faq.icon,
+                    "order": faq.order
+                }
+                for faq in faqs
+            ]
+
+            _faq_cache[cache_key] = (time.monotonic() + _FAQ_CACHE_TTL, faq_list)
+
         # 如果有限制數量
         if limit is not None and limit > 0:
             faq_list = faq_list[:limit]
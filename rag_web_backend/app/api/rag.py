@@ -1,28 +1,55 @@
 """RAG 查詢 API 路由"""
 
 import json
+import logging
 import time
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, or_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
-from jose import jwt, JWTError
+from jwt import PyJWTError
 
-from app.core.database import get_db
-from app.core.security import get_current_user
-from app.config import settings
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.security import get_current_user, decode_access_token, get_user_by_id_cached
 from app.models.user import User
-from app.models.query_history import QueryHistory
+from app.models.category import Category
+from app.models.file import File as FileModel
 from app.schemas.rag import (
     QueryRequest,
     QueryResponse,
     DocumentSource
 )
-from app.services.rag.rag_engine import RAGEngine
+from app.services.rag.engine_cache import get_engine
+from app.services.rag.query_cache import get_cached_result, store_result
+from app.services.history_writer import enqueue_history
 from app.services.activity import activity_service
 
+logger = logging.getLogger("app.rag")
+
 router = APIRouter(prefix="/rag", tags=["RAG查詢"])
 
+# 模組層級預先建好的查詢語句：
+# 每次請求只帶入 bindparam 值，不用重新建構與編譯 select 表達式
+_ALLOWED_FILES_STMT = (
+    select(FileModel.original_filename, FileModel.id)
+    .join(Category, FileModel.category_id == Category.id)
+    .where(
+        FileModel.department_id == bindparam("dept_id"),
+        FileModel.is_vectorized == True,  # 只查詢已向量化的檔案
+        or_(
+            FileModel.category_id.in_(bindparam("category_ids", expanding=True)),
+            Category.name == "其他"
+        )
+    )
+    .distinct()
+)
+
+_FILE_ID_BY_NAME_STMT = select(FileModel.original_filename, FileModel.id).where(
+    FileModel.department_id == bindparam("dept_id"),
+    FileModel.original_filename.in_(bindparam("names", expanding=True))
+)
+
 
 # 可選認證：允許匿名訪問
 async def get_current_user_optional(
@@ -36,34 +63,53 @@ async def get_current_user_optional(
     if not authorization:
         return None
     
+    # 只接受 Bearer scheme；replace() 會把字串中任何位置的
+    # "Bearer " 都拿掉，改用 startswith + 切片取出 token 本體
+    if not authorization.startswith("Bearer "):
+        return None
+
     try:
-        token = authorization.replace("Bearer ", "")
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id = payload.get("sub")
-        
+        token = authorization[len("Bearer "):]
+        payload = decode_access_token(token)  # 帶快取的解碼
+        # 新 token 帶整數 uid，舊 token 從字串 sub 解析
+        user_id = payload.get("uid")
+        if user_id is None and payload.get("sub"):
+            user_id = int(payload["sub"])
+
         if user_id:
-            result = await db.execute(select(User).where(User.id == int(user_id)))
-            return result.scalar_one_or_none()
-    except (JWTError, ValueError):
+            return await get_user_by_id_cached(db, user_id)
+    except (PyJWTError, ValueError):
         pass
     
     return None
 
-# TODO: Support multiple departments - currently hardcoded to department 1 (人事室)
-DEPARTMENT_ID = 1
-BASE_PATH = f"uploads/{DEPARTMENT_ID}/processed"
-
-# Initialize RAG Engine
-try:
-    rag_engine = RAGEngine(base_path=BASE_PATH, debug_mode=True)  # 開啟 debug 模式
-    print(f"✅ RAG Engine initialized with base_path: {BASE_PATH}")
-except Exception as e:
-    print(f"⚠️ Warning: Failed to initialize RAG Engine: {e}")
-    rag_engine = None
+def _enqueue_history(
+    user_id: Optional[int],
+    department_id: int,
+    query: str,
+    answer: str,
+    processing_time: float,
+    source_count: int,
+    category_ids: Optional[list],
+    scope_ids: Optional[list],
+    retrieved_docs: int
+) -> None:
+    """組裝查詢歷史列並交給批次寫入器（非阻塞）"""
+    enqueue_history({
+        "user_id": user_id,
+        "department_id": department_id,
+        "query": query,
+        "answer": answer,
+        "processing_time": processing_time,
+        "source_count": source_count,
+        "query_type": "semantic",
+        "scope": "all",
+        "extra_data": {
+            "category_ids": category_ids or [],
+            "scope_ids": scope_ids or [],
+            "retrieved_docs": retrieved_docs
+        }
+    })
 
 
 @router.post("/query", response_model=QueryResponse)
@@ -95,31 +141,18 @@ async def query_documents(
         
         # 處理分類過濾：如果有指定 category_ids，查詢符合條件的檔案清單
         allowed_filenames = None  # None 表示不過濾（查詢所有檔案）
+        id_by_name: dict = {}  # 檔名 → file_id，供最後組裝來源時使用
         if request.category_ids:
-            from app.models.category import Category
-            from app.models.file import File as FileModel
-            
-            # 1. 找出該處室的「其他」分類 ID
-            other_category_query = select(Category.id).where(
-                Category.department_id == department_id,
-                Category.name == "其他"
+            # 一條查詢完成「使用者選的分類 + 該處室的『其他』分類」的檔名篩選：
+            # 以 JOIN Category 直接比對分類名稱，
+            # 省去先查「其他」分類 ID 的額外往返；
+            # 順便帶回 file_id（索引整數），回應組裝時就不必再查一次
+            file_result = await db.execute(
+                _ALLOWED_FILES_STMT,
+                {"dept_id": department_id, "category_ids": request.category_ids}
             )
-            other_category_result = await db.execute(other_category_query)
-            other_category_id = other_category_result.scalar_one_or_none()
-            
-            # 2. 建立完整的分類 ID 清單（使用者選的 + 「其他」）
-            filter_category_ids = list(request.category_ids)
-            if other_category_id and other_category_id not in filter_category_ids:
-                filter_category_ids.append(other_category_id)
-            
-            # 3. 查詢符合分類條件的檔案
-            file_query = select(FileModel.original_filename).where(
-                FileModel.department_id == department_id,
-                FileModel.category_id.in_(filter_category_ids),
-                FileModel.is_vectorized == True  # 只查詢已向量化的檔案
-            )
-            file_result = await db.execute(file_query)
-            allowed_filenames = {row[0] for row in file_result.all()}  # 使用 set 加速查詢
+            id_by_name = {name: file_id for name, file_id in file_result.all()}
+            allowed_filenames = set(id_by_name)  # 使用 set 加速查詢
             
             if not allowed_filenames:
                 # 沒有符合條件的檔案，直接回傳空結果
@@ -129,52 +162,62 @@ async def query_documents(
                     sources=[]
                 )
         
-        # 動態初始化對應處室的 RAG 引擎
-        base_path = f"uploads/{department_id}/processed"
+        # 取得對應處室的 RAG 引擎（快取命中時零成本）
         try:
-            dept_rag_engine = RAGEngine(base_path=base_path, debug_mode=True)  # 開啟 debug 模式
+            dept_rag_engine = await get_engine(department_id)
         except Exception as e:
             raise HTTPException(
                 status_code=503,
                 detail=f"處室 {department_id} 的 RAG 引擎未初始化，請確認系統配置和 embeddings 資料"
             )
         
-        start_time = time.time()
-        
-        # Execute RAG query with async implementation (top_k fixed at 250)
-        result = await dept_rag_engine.query(
-            question=request.query,
-            top_k=250,
-            include_similarity_scores=True,  # Include scores for metadata
-            allowed_filenames=allowed_filenames  # 傳遞檔案過濾清單
-        )
-        
-        processing_time = time.time() - start_time
+        start_time = time.perf_counter()
+
+        # 先查快取：同處室、同問題、同權限範圍的重複查詢直接重用結果，
+        # 完全跳過檢索與 LLM 生成
+        result = get_cached_result(department_id, request.query, allowed_filenames)
+
+        if result is None:
+            # Execute RAG query with async implementation
+            # 第一階段只取 50 個候選即可：後面還有 cross-encoder rerank 把關，
+            # 250 個候選只是讓 rerank 與摘要載入多做 5 倍的工
+            result = await dept_rag_engine.query(
+                question=request.query,
+                top_k=50,
+                include_similarity_scores=True,  # Include scores for metadata
+                allowed_filenames=allowed_filenames  # 傳遞檔案過濾清單
+            )
+            store_result(department_id, request.query, allowed_filenames, result)
+
+        processing_time = time.perf_counter() - start_time
         
         # Convert sources to API format and fetch file_id from database
+        # 一次 IN 查詢取回所有來源的 file_id，
+        # 取代逐一來源各發一次 SELECT 的 N+1 往返；
+        # 有分類過濾時 id_by_name 已在前面一併取回，連這次查詢都省下
         sources = []
+        source_names = [source['filename'] for source in result['sources']]
+        if source_names and not id_by_name:
+            rows = (await db.execute(
+                _FILE_ID_BY_NAME_STMT,
+                {"dept_id": department_id, "names": source_names}
+            )).all()
+            id_by_name = {name: file_id for name, file_id in rows}
+
         for source in result['sources']:
             original_filename = source['filename']
-            
-            # Query database to find file_id
-            from app.models.file import File as FileModel
-            file_query = select(FileModel).where(
-                FileModel.department_id == department_id,
-                FileModel.original_filename == original_filename
-            )
-            file_result = await db.execute(file_query)
-            file_record = file_result.scalar_one_or_none()
-            
-            if not file_record:
+            file_id = id_by_name.get(original_filename)
+
+            if file_id is None:
                 # This should not happen - file record must exist for processed files
-                print(f"⚠️ Warning: File record not found for {original_filename}")
+                logger.warning("找不到來源檔案的資料庫記錄: %s", original_filename)
                 continue
-            
+
             doc_source = DocumentSource(
-                file_id=file_record.id,
+                file_id=file_id,
                 file_name=original_filename,
                 source_link=source.get('source_link', ''),
-                download_link=f"/public/files/{file_record.id}/download"  # 移除 /api 前綴，由前端的 BASE_URL 提供
+                download_link=f"/public/files/{file_id}/download"  # 移除 /api 前綴，由前端的 BASE_URL 提供
             )
             sources.append(doc_source)
         
@@ -192,51 +235,22 @@ async def query_documents(
                     "query_department_id": department_id
                 })
             )
-            
-            # 記錄到 QueryHistory (只記錄已登入使用者)
-            query_history = QueryHistory(
-                user_id=current_user.id,
-                department_id=department_id,
-                query=request.query,
-                answer=result['answer'],
-                processing_time=processing_time,
-                source_count=len(sources),
-                query_type="semantic",
-                scope="all",
-                extra_data={
-                    "category_ids": request.category_ids or [],
-                    "scope_ids": request.scope_ids or [],
-                    "retrieved_docs": result.get('retrieved_docs', 0)
-                }
-            )
-            db.add(query_history)
+            # log_activity 只 flush，事務由調用者收尾
             await db.commit()
-            print(f"✅ QueryHistory saved: query_id={query_history.id}, user_id={current_user.id}")
-        else:
-            try:
-                anonymous_history = QueryHistory(
-                    user_id=None,
-                    department_id=department_id,
-                    query=request.query,
-                    answer=result['answer'],
-                    processing_time=processing_time,
-                    source_count=len(sources),
-                    query_type="semantic",
-                    scope="all",
-                    extra_data={
-                        "category_ids": request.category_ids or [],
-                        "scope_ids": request.scope_ids or [],
-                        "retrieved_docs": result.get('retrieved_docs', 0)
-                    }
-                )
-                db.add(anonymous_history)
-                await db.commit()
-                print(f"✅ QueryHistory saved (anonymous): query_id={anonymous_history.id}")
-            except Exception as e:
-                print(f"❌ Failed to save anonymous QueryHistory: {e}")
-                import traceback
-                traceback.print_exc()
-                await db.rollback()
+
+        # 記錄到 QueryHistory：寫入不影響回答內容，
+        # 丟進批次寫入器即可返回，由背景任務合批 INSERT
+        _enqueue_history(
+            current_user.id if current_user else None,
+            department_id,
+            request.query,
+            result['answer'],
+            processing_time,
+            len(sources),
+            request.category_ids,
+            request.scope_ids,
+            result.get('retrieved_docs', 0)
+        )
 
         # Return simplified response
         return QueryResponse(
@@ -251,9 +265,166 @@ async def query_documents(
             detail=f"參數錯誤: {str(e)}"
         )
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("查詢處理失敗")
         raise HTTPException(
             status_code=500,
             detail=f"查詢處理失敗: {str(e)}"
         )
+
+
+def _sse_frame(payload: dict) -> str:
+    """將事件編成 SSE data 框"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.post("/query/stream")
+async def query_documents_stream(
+    request: QueryRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """RAG 串流查詢（SSE，公開端點）
+
+    檢索與快取邏輯同 /query，差別在回答以 SSE 逐段送出：
+    首字延遲縮短為 LLM 首 token 的時間，不用等整段答案生成完。
+    事件格式：{'type': 'answer', 'text': ...} 為答案片段，
+    最後一筆 {'type': 'done', 'sources': [...]}
+    """
+    # 決定處室 ID：優先使用 scope_ids[0]，否則使用已登入用戶的處室
+    department_id = None
+    if request.scope_ids and len(request.scope_ids) > 0:
+        department_id = request.scope_ids[0]
+    elif current_user and current_user.department_id:
+        department_id = current_user.department_id
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="未登入用戶必須指定 scope_ids"
+        )
+
+    # 分類過濾（同 /query）
+    allowed_filenames = None
+    id_by_name: dict = {}
+    if request.category_ids:
+        file_result = await db.execute(
+            _ALLOWED_FILES_STMT,
+            {"dept_id": department_id, "category_ids": request.category_ids}
+        )
+        id_by_name = {name: file_id for name, file_id in file_result.all()}
+        allowed_filenames = set(id_by_name)
+
+        if not allowed_filenames:
+            async def empty_stream():
+                yield _sse_frame({'type': 'answer', 'text': "抱歉，在選定的分類中找不到相關資訊。"})
+                yield _sse_frame({'type': 'done', 'sources': []})
+            return StreamingResponse(empty_stream(), media_type="text/event-stream")
+
+    try:
+        dept_rag_engine = await get_engine(department_id)
+    except Exception:
+        raise HTTPException(
+            status_code=503,
+            detail=f"處室 {department_id} 的 RAG 引擎未初始化，請確認系統配置和 embeddings 資料"
+        )
+
+    # 串流期間請求的 session 可能已被關閉，先把需要的值取出來
+    user_id = current_user.id if current_user else None
+    user_department_id = current_user.department_id if current_user else None
+
+    async def event_stream():
+        start_time = time.perf_counter()
+        answer_parts = []
+        engine_sources = []
+        retrieved_docs = 0
+
+        cached = get_cached_result(department_id, request.query, allowed_filenames)
+        if cached is not None:
+            # 快取命中：整段答案一次送出
+            answer_parts.append(cached['answer'])
+            engine_sources = cached['sources']
+            retrieved_docs = cached.get('retrieved_docs', 0)
+            yield _sse_frame({'type': 'answer', 'text': cached['answer']})
+        else:
+            async for event in dept_rag_engine.query_stream(
+                question=request.query,
+                top_k=50,
+                allowed_filenames=allowed_filenames
+            ):
+                if event['type'] == 'answer':
+                    answer_parts.append(event['text'])
+                    yield _sse_frame(event)
+                else:
+                    engine_sources = event['sources']
+                    retrieved_docs = event['retrieved_docs']
+
+            store_result(department_id, request.query, allowed_filenames, {
+                'question': request.query,
+                'answer': ''.join(answer_parts),
+                'sources': engine_sources,
+                'retrieved_docs': retrieved_docs
+            })
+
+        processing_time = time.perf_counter() - start_time
+
+        # 組裝來源：有分類過濾時沿用已取回的 id 對照，
+        # 否則開獨立 session 做一次 IN 批次查詢
+        source_names = [s['filename'] for s in engine_sources]
+        name_to_id = dict(id_by_name)
+        if source_names and not name_to_id:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(
+                    _FILE_ID_BY_NAME_STMT,
+                    {"dept_id": department_id, "names": source_names}
+                )).all()
+                name_to_id = {name: file_id for name, file_id in rows}
+
+        sources = []
+        for s in engine_sources:
+            file_id = name_to_id.get(s['filename'])
+            if file_id is None:
+                logger.warning("找不到來源檔案的資料庫記錄: %s", s['filename'])
+                continue
+            sources.append({
+                'file_id': file_id,
+                'file_name': s['filename'],
+                'source_link': s.get('source_link', ''),
+                'download_link': f"/public/files/{file_id}/download"
+            })
+
+        yield _sse_frame({'type': 'done', 'sources': sources})
+
+        # 記錄查詢活動（同 /query，僅限已登入用戶）；
+        # 請求的 session 可能已關閉，開獨立 session 寫入
+        if user_id is not None:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await activity_service.log_activity(
+                        db=session,
+                        user_id=user_id,
+                        activity_type="query",
+                        description=f"查詢: {request.query[:50]}...",
+                        department_id=user_department_id,
+                        extra_data=json.dumps({
+                            "source_count": len(sources),
+                            "retrieved_docs": retrieved_docs,
+                            "query_department_id": department_id
+                        })
+                    )
+                    await session.commit()
+            except Exception:
+                logger.exception("記錄查詢活動失敗")
+
+        # 串流結束後將查詢歷史交給批次寫入器
+        _enqueue_history(
+            user_id,
+            department_id,
+            request.query,
+            ''.join(answer_parts),
+            processing_time,
+            len(sources),
+            request.category_ids,
+            request.scope_ids,
+            retrieved_docs
+        )
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -3,8 +3,9 @@
 import os
 import shutil
 import platform
+import time
 from urllib.parse import urlparse
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -19,6 +20,12 @@ from app.config import settings
 
 router = APIRouter(tags=["統計與系統"])
 
+# 儀表板統計的 in-process 快取：
+# 內容每秒幾乎不變卻被輪詢，且包含整個上傳目錄的 os.walk，
+# 短 TTL 內直接回傳上次結果，省掉多次 DB 聚合與磁碟掃描
+_STATS_CACHE_TTL = 10  # 秒
+_stats_cache: dict = {}  # department_id -> (到期時間, payload)
+
 
 def _format_bytes(num: int) -> str:
     if num is None:
@@ -62,6 +69,11 @@ async def get_statistics(
     department_filter = current_user.department_id
     # 全部都要帶有處室id才能正確顯示各處室的統計數據
 
+    # 快取命中就直接回傳，不重算
+    cached = _stats_cache.get(department_filter)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
     # 1. 總檔案數
     file_query = select(func.count(File.id))
     if department_filter:
@@ -102,29 +114,38 @@ async def get_statistics(
     # 3.5 查詢類別統計（從 QueryHistory 的 extra_data 中提取 category_ids）
     queries_by_category = []
     try:
-        # 取得該處室所有查詢記錄
-        history_query = select(QueryHistory.extra_data).where(
-            QueryHistory.created_at >= month_start
-        )
+        # 讓 Postgres 直接展開 extra_data 的 category_ids 並聚合，
+        # 只回傳每個類別一列，取代把整個月的查詢記錄拉回 Python 逐筆累加
+        dept_cond = "AND department_id = :department_id" if department_filter else ""
+        params = {"month_start": month_start}
         if department_filter:
-            history_query = history_query.where(QueryHistory.department_id == department_filter)
-        
-        history_result = await db.execute(history_query)
-        category_count = {}
-        no_category_count = 0  # 統計未選擇類別的查詢
-        
-        # 統計每個類別被使用的次數
-        for row in history_result:
-            extra_data = row[0] or {}
-            category_ids = extra_data.get('category_ids', [])
-            
-            if not category_ids or len(category_ids) == 0:
-                # 未選擇類別
-                no_category_count += 1
-            else:
-                for cat_id in category_ids:
-                    category_count[cat_id] = category_count.get(cat_id, 0) + 1
-        
+            params["department_id"] = department_filter
+
+        cat_count_result = await db.execute(
+            text(f"""
+                SELECT elem::int AS category_id, COUNT(*) AS query_count
+                FROM query_history,
+                     json_array_elements_text(extra_data -> 'category_ids') AS elem
+                WHERE created_at >= :month_start {dept_cond}
+                GROUP BY elem::int
+            """),
+            params
+        )
+        category_count = {row.category_id: row.query_count for row in cat_count_result}
+
+        # 未選擇類別的查詢數
+        no_category_count = await db.scalar(
+            text(f"""
+                SELECT COUNT(*)
+                FROM query_history
+                WHERE created_at >= :month_start {dept_cond}
+                  AND (extra_data IS NULL
+                       OR extra_data -> 'category_ids' IS NULL
+                       OR json_array_length(extra_data -> 'category_ids') = 0)
+            """),
+            params
+        ) or 0
+
         # 取得類別名稱和顏色
         if category_count:
             category_ids_list = list(category_count.keys())
@@ -184,7 +205,7 @@ async def get_statistics(
         "message": "系統運行正常"
     }
     
-    return {
+    payload = {
         "totalFiles": total_files,
         "filesByCategory": files_by_category,
         "monthlyQueries": monthly_queries,
@@ -194,6 +215,10 @@ async def get_statistics(
         "storageTotal": storage_total
     }
 
+    _stats_cache[department_filter] = (time.monotonic() + _STATS_CACHE_TTL, payload)
+
+    return payload
+
 
 @router.get("/system/info", summary="取得系統資訊")
 async def get_system_info(
@@ -408,7 +433,7 @@ async def get_system_info(
         "cpuUsage": cpu_usage,
         "memoryUsage": memory_usage,
         "apiRequests": api_requests,
-        "updatedAt": datetime.utcnow().isoformat() + "Z",
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
         "queryStats": query_stats,
     }
 
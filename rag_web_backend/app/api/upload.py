@@ -4,7 +4,7 @@ from typing import List, Dict, Optional
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from pydantic import BaseModel
 
 from app.core.database import get_db
@@ -111,19 +111,28 @@ async def batch_upload(
     task_id = str(uuid.uuid4())
     
     # 1. 先刪除要移除的舊檔案
+    # 一次 IN 查詢取回本處室中符合的 (id, file_path)，
+    # 再一次 DELETE 清掉資料庫記錄，取代逐筆 db.get + delete 的 2N 次往返
     if remove_ids:
-        for file_id in remove_ids:
+        rows = (await db.execute(
+            select(FileModel.id, FileModel.file_path).where(
+                FileModel.id.in_(remove_ids),
+                FileModel.department_id == current_user.department_id
+            )
+        )).all()
+
+        for file_id, file_path in rows:
             try:
-                old_file = await db.get(FileModel, file_id)
-                if old_file and old_file.department_id == current_user.department_id:
-                    # 刪除實體檔案
-                    if os.path.exists(old_file.file_path):
-                        os.remove(old_file.file_path)
-                    # 刪除資料庫記錄
-                    await db.delete(old_file)
+                # 刪除實體檔案
+                if os.path.exists(file_path):
+                    os.remove(file_path)
             except Exception as e:
                 print(f"刪除檔案 {file_id} 失敗: {str(e)}")
-        
+
+        if rows:
+            await db.execute(
+                delete(FileModel).where(FileModel.id.in_([r.id for r in rows]))
+            )
         await db.commit()
     
     # 2. 初始化任務記錄（用於前端輪詢）
@@ -173,14 +182,13 @@ async def batch_upload(
             category_name = category_map.get(file.filename)
             category_id = None
             if category_name:
-                category_query = select(Category).where(
-                    Category.name == category_name,
-                    Category.department_id == current_user.department_id
+                # 只需要 id，不用把整個 Category 實體撈回來
+                category_id = await db.scalar(
+                    select(Category.id).where(
+                        Category.name == category_name,
+                        Category.department_id == current_user.department_id
+                    )
                 )
-                category_result = await db.execute(category_query)
-                category = category_result.scalar_one_or_none()
-                if category:
-                    category_id = category.id
             
             # 儲存檔案（檢查資料庫重複）
             try:
@@ -269,16 +277,15 @@ async def batch_upload(
         uploaded_file_ids = []
         for idx, file in enumerate(files):
             if task["files"][idx]["status"] == "completed":
-                # 從資料庫查詢檔案 ID
-                result = await db.execute(
-                    select(FileModel).where(
+                # 從資料庫查詢檔案 ID（只取 id 欄位）
+                file_id = await db.scalar(
+                    select(FileModel.id).where(
                         FileModel.original_filename == file.filename,
                         FileModel.department_id == current_user.department_id
                     ).order_by(FileModel.id.desc()).limit(1)
                 )
-                file_record = result.scalar_one_or_none()
-                if file_record:
-                    uploaded_file_ids.append(file_record.id)
+                if file_id:
+                    uploaded_file_ids.append(file_id)
         
         if uploaded_file_ids and background_tasks:
             # 啟動背景處理任務
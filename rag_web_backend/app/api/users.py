@@ -1,15 +1,24 @@
 """使用者管理 API 路由"""
 
+import asyncio
 import math
 from typing import Optional
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func, desc
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, func, desc, exists, or_, tuple_, bindparam, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.security import get_current_user, get_password_hash, verify_password, require_role
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.security import (
+    get_current_user,
+    get_password_hash_async,
+    verify_password_async,
+    require_role,
+    invalidate_user,
+)
 from app.models import User, UserRole, Department, Activity, ActivityType
 from app.schemas import (
     UserCreate,
@@ -24,6 +33,17 @@ from app.services.activity import activity_service
 
 router = APIRouter(prefix="/users", tags=["使用者管理"])
 
+# 依 ID 取使用者的查詢語句：模組載入時建構一次，
+# 取得 / 更新 / 刪除 / 改密碼四個端點共用，
+# 每次請求只綁定參數，省去重複的 Select 建構與編譯
+_USER_BY_ID_STMT = select(User).where(User.id == bindparam("user_id"))
+
+
+async def _count_users(conds: list) -> int:
+    """以獨立 session 計算符合條件的使用者總數（供與資料頁查詢並行執行）"""
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(func.count(User.id)).where(*conds)) or 0
+
 
 @router.post(
     "/",
@@ -48,25 +68,11 @@ async def create_user(
     - **full_name**: 全名
     - **department_id**: 所屬處室 ID
     """
-    # 檢查使用者名稱是否已存在
-    result = await db.execute(select(User).where(User.username == user_data.username))
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="使用者名稱已存在"
-        )
-    
-    # 檢查 Email 是否已存在
-    result = await db.execute(select(User).where(User.email == user_data.email))
-    if result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email 已被使用"
-        )
-    
-    # 檢查處室是否存在
-    result = await db.execute(select(Department).where(Department.id == user_data.department_id))
-    if not result.scalar_one_or_none():
+    # 檢查處室是否存在（EXISTS 只回傳布林值，不需載入整列資料）
+    department_exists = await db.scalar(
+        select(exists().where(Department.id == user_data.department_id))
+    )
+    if not department_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="處室不存在"
@@ -84,34 +90,67 @@ async def create_user(
     # 系統管理員非代理模式：無限制，可建立任何處室的使用者
     
     # 建立使用者
-    new_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
-        role=UserRole.ADMIN,  # 系統管理員建立的使用者預設為處室管理員
-        department_id=user_data.department_id,
-        is_active=True
+    # 以 INSERT ... ON CONFLICT DO NOTHING 取代「先 SELECT 檢查再 INSERT」，
+    # 單一語句即可完成，且在併發建立時不會有檢查與插入之間的競爭
+    stmt = (
+        pg_insert(User)
+        .values(
+            username=user_data.username,
+            email=user_data.email,
+            full_name=user_data.full_name,
+            hashed_password=await get_password_hash_async(user_data.password),
+            role=UserRole.ADMIN,  # 系統管理員建立的使用者預設為處室管理員
+            department_id=user_data.department_id,
+            is_active=True
+        )
+        .on_conflict_do_nothing()
+        .returning(User.id, User.created_at)
     )
-    
-    db.add(new_user)
-    
+    row = (await db.execute(stmt)).first()
+
+    if row is None:
+        # 撞到唯一鍵：查一次判斷是哪個欄位重複以回傳正確訊息
+        result = await db.execute(
+            select(User.username).where(
+                or_(User.username == user_data.username, User.email == user_data.email)
+            )
+        )
+        for (existing_username,) in result.all():
+            if existing_username == user_data.username:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="使用者名稱已存在"
+                )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email 已被使用"
+        )
+
     # 記錄活動
     await activity_service.log_activity(
         db=db,
         user_id=current_user.id,
         activity_type=ActivityType.CREATE_USER,
-        description=f"建立使用者: {new_user.username}",
+        description=f"建立使用者: {user_data.username}",
         department_id=current_user.department_id
     )
-    
+
     await db.commit()
-    await db.refresh(new_user)
-    
-    return new_user
+
+    return UserResponse(
+        id=row.id,
+        username=user_data.username,
+        email=user_data.email,
+        full_name=user_data.full_name,
+        role=UserRole.ADMIN.value,
+        is_active=True,
+        department_id=user_data.department_id,
+        created_at=row.created_at
+    )
 
 
-@router.get("/", response_model=UserListResponse, summary="取得使用者列表")
+# 列表回應含大量巢狀物件，改用 orjson 序列化省下可觀的 CPU
+@router.get("/", response_model=UserListResponse, response_class=ORJSONResponse, summary="取得使用者列表")
 async def list_users(
     page: int = Query(1, ge=1, description="頁碼"),
     limit: int = Query(20, ge=1, le=100, description="每頁筆數"),
@@ -119,73 +158,113 @@ async def list_users(
     is_active: Optional[bool] = Query(None, description="篩選是否啟用"),
     role: Optional[str] = Query(None, description="篩選角色"),
     search: Optional[str] = Query(None, description="搜尋使用者名稱或全名"),
+    cursor: Optional[str] = Query(None, description="keyset 分頁游標（取自上一頁回應的 next_cursor）"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     取得使用者列表（分頁）
-    
+
     - **page**: 頁碼
     - **limit**: 每頁筆數
     - **department_id**: 篩選特定處室
     - **is_active**: 篩選是否啟用
     - **role**: 篩選角色
     - **search**: 搜尋使用者名稱或全名
-    
+    - **cursor**: 提供時改用 keyset 分頁，逐頁往後翻不再隨頁數變慢
+
     處室管理員只能查看自己處室的使用者
     """
-    query = select(User)
-    
+    # 篩選條件（資料頁與總數查詢共用）
+    conds = []
+
     # 處室管理員只能查詢自己處室的使用者
     # 系統管理員在代理模式下（有 department_id）也只能查詢代理處室的使用者
     # 系統管理員非代理模式可以查詢所有使用者
     if current_user.role == UserRole.ADMIN:
         # 處室管理員：只能看自己處室
-        query = query.where(User.department_id == current_user.department_id)
+        conds.append(User.department_id == current_user.department_id)
     elif current_user.role == UserRole.SUPER_ADMIN and current_user.department_id is not None:
         # 系統管理員代理模式：只能看代理處室
-        query = query.where(User.department_id == current_user.department_id)
+        conds.append(User.department_id == current_user.department_id)
     elif department_id and current_user.role == UserRole.SUPER_ADMIN:
         # 系統管理員非代理模式：可以按 department_id 篩選
-        query = query.where(User.department_id == department_id)
-    
+        conds.append(User.department_id == department_id)
+
     # 篩選是否啟用
     if is_active is not None:
-        query = query.where(User.is_active == is_active)
-    
+        conds.append(User.is_active == is_active)
+
     # 篩選角色
     if role:
         try:
             role_enum = UserRole(role)
-            query = query.where(User.role == role_enum)
+            conds.append(User.role == role_enum)
         except ValueError:
             raise HTTPException(status_code=400, detail="無效的角色")
-    
+
     # 搜尋
     if search:
         search_pattern = f"%{search}%"
-        query = query.where(
+        conds.append(
             (User.username.ilike(search_pattern)) |
             (User.full_name.ilike(search_pattern)) |
             (User.email.ilike(search_pattern))
         )
-    
-    # 計算總數
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await db.scalar(count_query) or 0
-    
+
     # 分頁
-    query = query.order_by(User.created_at.desc()).offset((page - 1) * limit).limit(limit)
-    
-    result = await db.execute(query)
+    # 提供 cursor 時使用 keyset（seek）分頁：以 (created_at, id) 為鍵續接上一頁，
+    # 避免 OFFSET 掃描並丟棄前面所有列，深頁不再是 O(頁數 × 筆數)
+    page_conds = list(conds)
+    offset = (page - 1) * limit
+    if cursor:
+        try:
+            cursor_ts, cursor_id = cursor.rsplit("|", 1)
+            cursor_key = (datetime.fromisoformat(cursor_ts), int(cursor_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="無效的游標格式")
+        page_conds.append(tuple_(User.created_at, User.id) < cursor_key)
+        offset = 0
+
+    query = (
+        select(User)
+        .where(*page_conds)
+        .order_by(User.created_at.desc(), User.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+    # 總數與資料頁互相獨立，用兩條連線並行查詢，減少一次串行往返的等待
+    total, result = await asyncio.gather(_count_users(conds), db.execute(query))
     users = result.scalars().all()
-    
+
+    # 滿頁才有下一頁，回傳續接用的游標
+    next_cursor = None
+    if len(users) == limit:
+        next_cursor = f"{users[-1].created_at.isoformat()}|{users[-1].id}"
+    
+    # ORM 物件欄位已知且可信，model_construct 跳過逐列的 pydantic 驗證
+    items = [
+        UserResponse.model_construct(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role.value,
+            is_active=user.is_active,
+            department_id=user.department_id,
+            created_at=user.created_at
+        )
+        for user in users
+    ]
+
     return UserListResponse(
-        items=[UserResponse.model_validate(user) for user in users],
+        items=items,
         total=total,
         page=page,
         page_size=limit,
-        pages=math.ceil(total / limit) if total > 0 else 0
+        pages=math.ceil(total / limit) if total > 0 else 0,
+        next_cursor=next_cursor
     )
 
 
@@ -202,7 +281,7 @@ async def get_user(
     
     處室管理員只能查看自己處室的使用者
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(_USER_BY_ID_STMT, {"user_id": user_id})
     user = result.scalar_one_or_none()
     
     if not user:
@@ -256,7 +335,7 @@ async def update_user(
     - **department_id**: 新的處室 ID（可選）
     - **is_active**: 是否啟用（可選）
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(_USER_BY_ID_STMT, {"user_id": user_id})
     user = result.scalar_one_or_none()
     
     if not user:
@@ -281,23 +360,25 @@ async def update_user(
     
     # 處理密碼更新
     if "password" in update_data and update_data["password"]:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
     
-    # 檢查 Email 是否重複
+    # 檢查 Email 是否重複（EXISTS 只回傳布林值，不需載入整列資料）
     if "email" in update_data:
-        result = await db.execute(
-            select(User).where(User.email == update_data["email"], User.id != user_id)
+        email_taken = await db.scalar(
+            select(exists().where(User.email == update_data["email"], User.id != user_id))
         )
-        if result.scalar_one_or_none():
+        if email_taken:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email 已被使用"
             )
-    
+
     # 檢查處室是否存在
     if "department_id" in update_data:
-        result = await db.execute(select(Department).where(Department.id == update_data["department_id"]))
-        if not result.scalar_one_or_none():
+        department_exists = await db.scalar(
+            select(exists().where(Department.id == update_data["department_id"]))
+        )
+        if not department_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="處室不存在"
@@ -315,9 +396,10 @@ async def update_user(
         department_id=current_user.department_id
     )
     
+    # expire_on_commit=False：commit 後屬性仍有效，不需 refresh 重查一次
     await db.commit()
-    await db.refresh(user)
-    
+    invalidate_user(user_id)  # 讓認證快取立即反映異動
+
     return user
 
 
@@ -347,17 +429,17 @@ async def delete_user(
             detail="不能刪除自己"
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
+    # 只取活動記錄與回應訊息需要的 username，
+    # 不載入完整 ORM 實體（刪除交給 DB 端的 FK CASCADE，
+    # 不需要 ORM 走訪 uploaded_files / activities 等關聯集合）
+    username = await db.scalar(select(User.username).where(User.id == user_id))
+
+    if username is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="使用者不存在"
         )
-    
-    username = user.username
-    
+
     # 記錄活動
     await activity_service.log_activity(
         db=db,
@@ -366,11 +448,11 @@ async def delete_user(
         description=f"刪除使用者: {username}",
         department_id=current_user.department_id
     )
-    
-    await db.delete(user)
-    await db.commit()
+
+    await db.execute(delete(User).where(User.id == user_id))
     await db.commit()
-    
+    invalidate_user(user_id)  # 讓認證快取立即反映異動
+
     return MessageResponse(
         message="使用者刪除成功",
         detail=f"已刪除使用者: {username}"
@@ -394,7 +476,7 @@ async def change_password(
     - **old_password**: 舊密碼（管理員可省略）
     - **new_password**: 新密碼
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(_USER_BY_ID_STMT, {"user_id": user_id})
     user = result.scalar_one_or_none()
     
     if not user:
@@ -416,14 +498,14 @@ async def change_password(
     
     # 如果是修改自己的密碼，需要驗證舊密碼
     if is_self and not is_super_admin:
-        if not verify_password(password_data.old_password, user.hashed_password):
+        if not await verify_password_async(password_data.old_password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="舊密碼錯誤"
             )
     
     # 更新密碼
-    user.hashed_password = get_password_hash(password_data.new_password)
+    user.hashed_password = await get_password_hash_async(password_data.new_password)
     
     # 記錄活動
     await activity_service.log_activity(
@@ -435,7 +517,8 @@ async def change_password(
     )
     
     await db.commit()
-    
+    invalidate_user(user_id)  # 讓認證快取立即反映異動
+
     return {"message": "密碼修改成功"}
     
     return MessageResponse(
@@ -459,49 +542,48 @@ async def get_user_stats(
     
     處室管理員只能看自己處室的統計
     """
-    # 基礎查詢（處室隔離）
+    # 基礎篩選條件（處室隔離）
     # 處室管理員只能看自己處室的統計
     # 系統管理員在代理模式下也只能看代理處室的統計
     # 系統管理員非代理模式可以看所有統計
-    base_query = select(User)
+    conds = []
     if current_user.role == UserRole.ADMIN:
         # 處室管理員：只能看自己處室
-        base_query = base_query.where(User.department_id == current_user.department_id)
+        conds.append(User.department_id == current_user.department_id)
     elif current_user.role == UserRole.SUPER_ADMIN and current_user.department_id is not None:
         # 系統管理員代理模式：只能看代理處室
-        base_query = base_query.where(User.department_id == current_user.department_id)
+        conds.append(User.department_id == current_user.department_id)
     # 系統管理員非代理模式：無限制，可看所有統計
-    
-    # 1. 總使用者數
-    total_query = select(func.count()).select_from(base_query.subquery())
-    total_users = await db.scalar(total_query) or 0
-    
-    # 2. 啟用使用者數
-    active_query = select(func.count()).select_from(
-        base_query.where(User.is_active == True).subquery()
-    )
-    active_users = await db.scalar(active_query) or 0
-    
-    # 3. 停用使用者數
+
+    # 1-3. 總數與啟用/停用數：用條件彙總（FILTER）一次查詢取得，
+    # 不再為每個計數各跑一次 COUNT
+    counts_row = (await db.execute(
+        select(
+            func.count().label('total'),
+            func.count().filter(User.is_active == True).label('active')
+        ).select_from(User).where(*conds)
+    )).one()
+    total_users = counts_row.total or 0
+    active_users = counts_row.active or 0
     inactive_users = total_users - active_users
-    
+
     # 4. 依角色統計
     role_query = select(
         User.role,
         func.count(User.id).label('count')
-    ).select_from(base_query.subquery()).group_by(User.role)
-    
+    ).where(*conds).group_by(User.role)
+
     role_result = await db.execute(role_query)
     by_role = {row[0].value: row[1] for row in role_result.all()}
-    
+
     # 5. 依處室統計
     dept_query = select(
         Department.id,
         Department.name,
         func.count(User.id).label('user_count')
-    ).select_from(
-        base_query.subquery()
-    ).join(Department, User.department_id == Department.id).group_by(
+    ).join(
+        Department, User.department_id == Department.id
+    ).where(*conds).group_by(
         Department.id, Department.name
     ).order_by(desc('user_count'))
     
@@ -1,5 +1,6 @@
 """應用程式配置管理"""
 
+from functools import cached_property
 from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,11 +17,15 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 1440
+    BCRYPT_ROUNDS: int = 12  # bcrypt 工作因子，可依部署環境的延遲預算調整
     
     # 資料庫
     DATABASE_URL: str
     DB_POOL_SIZE: int = 20
     DB_MAX_OVERFLOW: int = 40
+    DB_POOL_TIMEOUT: int = 30  # 等待連線的秒數上限，避免高負載時請求無限排隊
+    DB_POOL_PRE_PING: bool = True  # 取用連線前先探測，避免拿到已被對端關閉的連線
+    DB_POOL_RECYCLE: int = 1800  # 連線存活上限（秒），早於中間設備的 idle timeout 回收
     
     # 檔案上傳
     MAX_FILE_SIZE: int = 52428800  # 50MB
@@ -30,6 +35,9 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "*"
     
+    # RAG 設定
+    RERANK_BATCH_SIZE: int = 32  # CrossEncoder 一次前向的配對數，依顯存/記憶體調整
+
     # Ollama 設定
     OLLAMA_BASE_URL: str = ""
     OLLAMA_SUMMARY_MODEL: str = ""
@@ -43,12 +51,15 @@ class Settings(BaseSettings):
         extra="ignore"
     )
     
-    @property
+    # 以 cached_property 記住拆分結果：
+    # 這兩個列表每次請求都會被讀取（CORS middleware、上傳驗證），
+    # 設定在啟動後不會變動，不需要每次重新 split
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """將 CORS_ORIGINS 字串轉換為列表"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
-    
-    @property
+
+    @cached_property
     def allowed_extensions_list(self) -> List[str]:
         """將 ALLOWED_EXTENSIONS 字串轉換為列表"""
         return [ext.strip() for ext in self.ALLOWED_EXTENSIONS.split(",")]
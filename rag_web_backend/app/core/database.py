@@ -1,18 +1,34 @@
 """資料庫連線與 Session 管理"""
 
 from typing import AsyncGenerator
+
+import orjson
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
 
+
+def _json_serializer(obj) -> str:
+    """JSON 欄位改用 orjson 編碼（輸出 bytes，轉回 str 供驅動使用）"""
+    return orjson.dumps(obj).decode()
+
+
 # 建立異步引擎
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,  # 開發環境顯示 SQL
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
     pool_size=settings.DB_POOL_SIZE,
     max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_pre_ping=True,  # 連線前檢測是否有效
-    pool_recycle=3600,   # 1小時回收連線
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # 連線前檢測是否有效
+    pool_recycle=settings.DB_POOL_RECYCLE,    # 定期回收連線
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # 取得連線的等待上限
+    connect_args={
+        # 放大 asyncpg 的 prepared statement 快取：
+        # 熱路徑的小查詢以 BIND + EXECUTE 執行，不用每次重新 PARSE
+        "prepared_statement_cache_size": 1024,
+    },
 )
 
 # 建立 Session Factory
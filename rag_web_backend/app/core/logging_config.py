@@ -1,8 +1,11 @@
 """日誌配置"""
 
+import atexit
 import logging
 import logging.config
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 # 日誌目錄
@@ -72,11 +75,35 @@ LOGGING_CONFIG = {
 }
 
 
+def _move_to_background(logger_names: tuple, handler: logging.Handler) -> None:
+    """把指定 logger 的輸出改走佇列，由背景執行緒負責實際寫入
+
+    stdout 的 write() 是同步 syscall，會在每筆日誌上阻塞事件迴圈；
+    改掛 QueueHandler 後，請求路徑只做一次非阻塞的 queue.put，
+    真正的輸出由 QueueListener 在獨立執行緒完成
+    """
+    log_queue = queue.Queue(-1)
+    queue_handler = QueueHandler(log_queue)
+
+    for name in logger_names:
+        logging.getLogger(name).handlers = [queue_handler]
+
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+
 def setup_logging():
     """初始化日誌配置"""
     # 應用日誌配置
     logging.config.dictConfig(LOGGING_CONFIG)
-    
+
+    # 把同步的 console 寫入移到背景執行緒（access 格式不同，各用一條佇列）
+    console_handler = logging.getLogger("app").handlers[0]
+    access_handler = logging.getLogger("uvicorn.access").handlers[0]
+    _move_to_background(("uvicorn", "uvicorn.error", "app", ""), console_handler)
+    _move_to_background(("uvicorn.access",), access_handler)
+
     # 記錄初始化訊息
     logger = logging.getLogger("app")
     logger.info("=" * 80)
@@ -3,27 +3,88 @@
 提供密碼加密、JWT Token 生成與驗證等功能
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import bcrypt
+import jwt
+import orjson
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy import select
+from jwt import InvalidTokenError, PyJWTError
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, raiseload
 
 from app.config import settings
 from app.core.database import get_db
 from app.models import User
+from app.models.department import Department
 
-# 密碼加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class _OrjsonPyJWT(jwt.api_jwt.PyJWT):
+    """payload 的 JSON 編解碼改走 orjson
+
+    HS256 的簽章驗證很快，stdlib json 的 payload 序列化
+    反而佔掉每個 token 不小比例的時間；orjson 的 C 實作可省下這段。
+    orjson.dumps 本身就輸出無多餘空白的緊湊格式，與 PyJWT 預設一致
+    """
+
+    def _encode_payload(self, payload, headers=None, json_encoder=None):
+        return orjson.dumps(payload)
+
+    def _decode_payload(self, decoded):
+        try:
+            return orjson.loads(decoded["payload"])
+        except orjson.JSONDecodeError:
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+
+
+# 全域共用的 JWT 編解碼器（取代模組層級的 jwt.encode/decode）
+_jwt_codec = _OrjsonPyJWT()
+
+
+# 固定的假雜湊：帳號不存在時仍執行一次 bcrypt 驗證，
+# 讓「帳號不存在」與「密碼錯誤」的回應耗時一致，避免時間側信道洩漏帳號是否存在
+_DUMMY_HASH = bcrypt.hashpw(
+    b"dummy-password", bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+).decode()
 
 # OAuth2 密碼流
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
 
+# 認證熱路徑的查詢語句：模組載入時建構一次，
+# 每次請求只綁定參數，省去重複的 Select 建構與編譯。
+# department 是 many-to-one 且只會有一列，
+# 用 joinedload 以 LEFT OUTER JOIN 併進同一條 SELECT，
+# 每次認證省下 selectinload 的第二次往返
+_USER_BY_ID_STMT = (
+    select(User)
+    .options(raiseload('*'), joinedload(User.department))
+    .where(User.id == bindparam("user_id"))
+)
+
+_USER_BY_USERNAME_STMT = (
+    select(User)
+    .options(joinedload(User.department))
+    .where(User.username == bindparam("username"))
+)
+
+# 代理模式專用：使用者與代理目標處室一次撈回，
+# 省去原本「查 User、再查 Department」的第二次往返。
+# 用 LEFT OUTER JOIN，目標處室不存在時仍回傳使用者列（Department 為 None）
+_USER_WITH_PROXY_DEPT_STMT = (
+    select(User, Department)
+    .options(raiseload('*'), joinedload(User.department))
+    .join(Department, Department.id == bindparam("proxy_dept_id"), isouter=True)
+    .where(User.id == bindparam("user_id"))
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -36,7 +97,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: 密碼是否正確
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    # 直接呼叫 bcrypt C 擴充，省去 passlib 每次的 scheme 解析與包裝開銷
+    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
 def get_password_hash(password: str) -> str:
@@ -49,7 +111,161 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: 雜湊後的密碼
     """
-    return pwd_context.hash(password)
+    hashed = bcrypt.hashpw(
+        password.encode("utf-8"), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    )
+    return hashed.decode("utf-8")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在執行緒池中驗證密碼
+
+    bcrypt 驗證與雜湊一樣是上百毫秒的純 CPU 運算，
+    留在事件迴圈上會讓同時間的其他請求全部排隊等它；
+    bcrypt 的 C 擴充會釋放 GIL，移到執行緒池即可真正並行
+
+    Args:
+        plain_password: 明文密碼
+        hashed_password: 雜湊密碼
+
+    Returns:
+        bool: 密碼是否正確
+    """
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    在執行緒池中計算密碼雜湊
+
+    bcrypt 雜湊是純 CPU 運算（數十到數百毫秒），
+    直接在 async 處理函數中呼叫會阻塞事件迴圈，
+    改用 asyncio.to_thread 移到執行緒池執行
+
+    Args:
+        password: 明文密碼
+
+    Returns:
+        str: 雜湊後的密碼
+    """
+    return await asyncio.to_thread(get_password_hash, password)
+
+
+# JWT 解碼結果快取：
+# 同一把 token 每個請求都重做一次 HMAC-SHA256 驗證與 base64 解碼，
+# 輸入相同結果必相同，是可以直接記住的純 CPU 工作。
+# 鍵用 token 的 blake2b 摘要，不把原始 token 留在記憶體；
+# TTL 短（60 秒），token 撤銷或換密鑰的影響範圍有上界
+_JWT_CACHE_TTL = 60
+_JWT_CACHE_MAX_ENTRIES = 10000
+_jwt_cache: OrderedDict = OrderedDict()  # token 摘要 -> (快取到期時間, payload)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    解碼並驗證 JWT Token，結果以短 TTL 快取
+
+    Args:
+        token: JWT Token
+
+    Returns:
+        dict: 解碼後的 payload
+
+    Raises:
+        PyJWTError: Token 無效或已過期
+    """
+    # 結構快篩：JWT 必為「三段 base64url、長度合理」，
+    # 明顯畸形的字串直接拒絕，不讓帶著正確前綴的垃圾 token
+    # 每個請求都逼系統做一次完整的 HMAC 驗證
+    if not (80 <= len(token) <= 4096) or token.count(".") != 2:
+        raise InvalidTokenError("Token 格式無效")
+
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.monotonic()
+
+    entry = _jwt_cache.get(key)
+    if entry is not None:
+        cache_expiry, payload = entry
+        if now < cache_expiry:
+            # 命中時仍檢查 token 本身的 exp，過期不因快取而放行
+            exp = payload.get("exp")
+            if exp is not None and exp <= datetime.now(timezone.utc).timestamp():
+                raise InvalidTokenError("Token 已過期")
+            _jwt_cache.move_to_end(key)
+            return payload
+        del _jwt_cache[key]
+
+    payload = _jwt_codec.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    _jwt_cache[key] = (now + _JWT_CACHE_TTL, payload)
+    _jwt_cache.move_to_end(key)
+    while len(_jwt_cache) > _JWT_CACHE_MAX_ENTRIES:
+        _jwt_cache.popitem(last=False)
+    return payload
+
+
+# 認證使用者快取：
+# 每個已登入請求都對 users 表發同一條 SELECT，
+# 以 user_id 為鍵快取脫離 session 的 User 物件（department 已預先載入），
+# TTL 短（30 秒），資料異動端另以 invalidate_user 主動失效
+_USER_CACHE_TTL = 30
+_USER_CACHE_MAX_ENTRIES = 4096
+_user_cache: OrderedDict = OrderedDict()  # user_id -> (快取到期時間, User)
+
+
+def invalidate_user(user_id: int) -> None:
+    """使指定使用者的認證快取立即失效（使用者資料異動後呼叫）"""
+    _user_cache.pop(user_id, None)
+
+
+def _get_cached_user(user_id: int) -> Optional[User]:
+    """讀取快取中的使用者；過期或不存在返回 None"""
+    entry = _user_cache.get(user_id)
+    if entry is None:
+        return None
+    expiry, user = entry
+    if time.monotonic() >= expiry:
+        del _user_cache[user_id]
+        return None
+    _user_cache.move_to_end(user_id)
+    return user
+
+
+def _store_user(user: User) -> None:
+    """寫入使用者快取並維持容量上限"""
+    _user_cache[user.id] = (time.monotonic() + _USER_CACHE_TTL, user)
+    _user_cache.move_to_end(user.id)
+    while len(_user_cache) > _USER_CACHE_MAX_ENTRIES:
+        _user_cache.popitem(last=False)
+
+
+async def get_user_by_id_cached(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    以 TTL 快取取得使用者（含 department）
+
+    未命中時查詢資料庫並將物件 expunge 脫離 session 後存入快取，
+    之後的請求直接重用，省去每請求一次的 SELECT 往返。
+    回傳的一律是唯讀的淺複本：快取中的原件不交給任何請求，
+    就地修改不會外洩到其他併發請求。
+    注意複本與原件共用 ORM 狀態，對它 db.add 不會產生 UPDATE——
+    要寫回資料庫的路由必須在自己的 session 重新 SELECT 該列
+
+    Args:
+        db: 資料庫 Session
+        user_id: 使用者 ID
+
+    Returns:
+        Optional[User]: 使用者物件（脫離 session 的唯讀淺複本），不存在返回 None
+    """
+    user = _get_cached_user(user_id)
+    if user is None:
+        result = await db.execute(_USER_BY_ID_STMT, {"user_id": user_id})
+        user = result.scalar_one_or_none()
+        if user is None:
+            return None
+        db.expunge(user)
+        _store_user(user)
+    return copy.copy(user)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -71,7 +287,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    encoded_jwt = _jwt_codec.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     
     return encoded_jwt
 
@@ -109,73 +325,76 @@ async def get_current_user(
     )
     
     try:
-        # 解碼 JWT Token
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        
+        # 解碼 JWT Token（帶快取）
+        payload = decode_access_token(token)
+        # 新核發的 token 帶整數 uid，免去每請求一次的 int(sub) 轉換；
+        # 舊 token 仍從字串 sub 解析
+        user_id: Optional[int] = payload.get("uid")
         if user_id is None:
-            raise credentials_exception
-            
-    except JWTError:
+            sub = payload.get("sub")
+            if sub is None:
+                raise credentials_exception
+            user_id = int(sub)
+
+    except (PyJWTError, ValueError):
         raise credentials_exception
     
-    # 從資料庫取得使用者
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.department))
-        .where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
-    
+    # 取得使用者：
+    # 一般請求走 TTL 快取；代理模式會就地改寫 department_id，
+    # 必須拿一份不進快取的新物件，避免改動外洩到其他請求。
+    # 代理模式以 OUTER JOIN 同時撈回目標處室，單次往返取代原本的兩條 SELECT
+    if x_proxy_department_id is not None:
+        try:
+            proxy_dept_id = int(x_proxy_department_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無效的處室 ID 格式"
+            )
+        result = await db.execute(
+            _USER_WITH_PROXY_DEPT_STMT,
+            {"user_id": user_id, "proxy_dept_id": proxy_dept_id}
+        )
+        row = result.first()
+        user, proxy_department = row if row is not None else (None, None)
+    else:
+        user = await get_user_by_id_cached(db, user_id)
+
     if user is None:
         raise credentials_exception
-    
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="使用者帳號已停用"
         )
-    
+
     # 處理 super_admin 代理模式
     if x_proxy_department_id is not None:
         from app.models.user import UserRole
-        
+
         # 只有 super_admin 可以使用代理功能
         if user.role != UserRole.SUPER_ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="只有超級管理員可以使用代理功能"
             )
-        
-        # 驗證目標處室是否存在
-        try:
-            proxy_dept_id = int(x_proxy_department_id)
-            from app.models.department import Department
-            dept_result = await db.execute(
-                select(Department).where(Department.id == proxy_dept_id)
-            )
-            department = dept_result.scalar_one_or_none()
-            
-            if department is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"處室 ID {proxy_dept_id} 不存在"
-                )
-            
-            # 從 session 中移除 user 物件,防止後續的 commit 影響資料庫
-            db.expunge(user)
-            
-            # 臨時覆蓋 department_id 和 department
-            # 由於已經 expunge,這不會影響資料庫
-            user.department_id = proxy_dept_id
-            user.department = department
-            
-        except ValueError:
+
+        # 驗證目標處室是否存在（OUTER JOIN 沒撈到即不存在）
+        if proxy_department is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="無效的處室 ID 格式"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"處室 ID {proxy_dept_id} 不存在"
             )
-    
+
+        # 從 session 中移除 user 物件,防止後續的 commit 影響資料庫
+        db.expunge(user)
+
+        # 臨時覆蓋 department_id 和 department
+        # 由於已經 expunge,這不會影響資料庫
+        user.department_id = proxy_dept_id
+        user.department = proxy_department
+
     return user
 
 
@@ -218,13 +437,8 @@ async def get_current_active_admin(
         HTTPException: 使用者不是管理員或帳號未啟用
     """
     from app.models.user import UserRole
-    
-    if not current_user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="使用者帳號未啟用"
-        )
-    
+
+    # is_active 已由 get_current_user 檢查過，這裡不再重複
     if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -249,12 +463,7 @@ async def get_current_super_admin(
     Raises:
         HTTPException: 使用者不是超級管理員
     """
-    if not current_user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="使用者帳號未啟用"
-        )
-    
+    # is_active 已由 get_current_user 檢查過，這裡不再重複
     if not current_user.is_super_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -276,28 +485,31 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> O
     Returns:
         Optional[User]: 驗證成功返回使用者物件，失敗返回 None
     """
-    result = await db.execute(
-        select(User)
-        .options(selectinload(User.department))
-        .where(User.username == username)
-    )
+    result = await db.execute(_USER_BY_USERNAME_STMT, {"username": username})
     user = result.scalar_one_or_none()
-    
+
     if not user:
+        # 對假雜湊做一次驗證以抹平時間差
+        await verify_password_async(password, _DUMMY_HASH)
         return None
-    
-    if not verify_password(password, user.hashed_password):
+
+    if not await verify_password_async(password, user.hashed_password):
         return None
     
     return user
 
 
+@functools.lru_cache(maxsize=None)
 def require_role(*allowed_roles):
     """
     權限檢查裝飾器工廠
-    
+
     建立一個依賴注入函數，檢查使用者是否具有指定角色
-    
+
+    以 lru_cache 記住同一組角色對應的 checker：
+    FastAPI 的請求內依賴快取是以 callable 身分為鍵，
+    回傳同一個函數物件才能讓多層依賴共用一次 get_current_user
+
     Args:
         *allowed_roles: 允許的角色列表
         
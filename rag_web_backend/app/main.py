@@ -1,5 +1,6 @@
 """FastAPI 應用程式主入口"""
 
+import hashlib
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -15,7 +16,12 @@ async def lifespan(app: FastAPI):
     """應用程式生命週期管理"""
     # 初始化日誌系統（清空舊日誌、配置格式）
     logger = setup_logging()
-    
+
+    # 確認 SHA-256 走 OpenSSL 實作（JWT 的 HMAC-SHA256 可吃到 SHA-NI 硬體加速）
+    # OpenSSL 版本的建構子名稱為 openssl_sha256，純 Python/內建 fallback 則為 sha256
+    if "openssl" not in getattr(hashlib.sha256, "__name__", ""):
+        logger.warning("⚠️ hashlib.sha256 未使用 OpenSSL 實作，JWT 簽章驗證效能將下降")
+
     # 啟動時初始化資料庫連線
     await init_db()
     logger.info("✅ 資料庫連線已初始化")
@@ -1,7 +1,7 @@
 """活動記錄模型"""
 
 from typing import TYPE_CHECKING
-from sqlalchemy import String, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import String, ForeignKey, Text, Enum as SQLEnum, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 from app.core.database import Base
@@ -42,7 +42,12 @@ class Activity(Base, TimestampMixin):
     """活動記錄表"""
     
     __tablename__ = "activities"
-    
+
+    # 活動列表以處室過濾、建立時間倒序顯示最近活動
+    __table_args__ = (
+        Index('ix_activities_dept_created', 'department_id', text('created_at DESC')),
+    )
+
     # 主鍵
     id: Mapped[int] = mapped_column(primary_key=True, comment="活動 ID")
     
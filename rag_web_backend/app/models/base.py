@@ -1,23 +1,32 @@
 """資料庫模型基礎類別"""
 
 from datetime import datetime, timezone
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 
 class TimestampMixin:
-    """時間戳記 Mixin"""
-    
+    """時間戳記 Mixin
+
+    時間戳由資料庫端 now() 填入：
+    INSERT 不再為每列綁定 Python 產生的 timestamp 參數，
+    且同一交易內所有列的時間一致、不受應用程式主機時鐘偏移影響
+    """
+
+    # INSERT 直接以 RETURNING 帶回 DB 填入的時間戳，
+    # 避免之後存取 created_at 時觸發 async 下不允許的隱式 lazy load
+    __mapper_args__ = {"eager_defaults": True}
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
         nullable=False,
         comment="建立時間"
     )
-    
+
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
         comment="更新時間"
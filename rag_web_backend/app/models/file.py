@@ -2,7 +2,7 @@
 
 from typing import List, TYPE_CHECKING
 from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, Text, Boolean, Enum as SQLEnum, DateTime
+from sqlalchemy import String, Integer, ForeignKey, Text, Boolean, Enum as SQLEnum, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 from app.core.database import Base
@@ -27,7 +27,13 @@ class File(Base, TimestampMixin):
     """檔案表"""
     
     __tablename__ = "files"
-    
+
+    # 檔案列表固定以處室過濾、建立時間倒序分頁，
+    # 複合索引讓分頁直接沿索引讀取而不需排序
+    __table_args__ = (
+        Index('ix_files_dept_created', 'department_id', text('created_at DESC')),
+    )
+
     # 主鍵
     id: Mapped[int] = mapped_column(primary_key=True, comment="檔案 ID")
     
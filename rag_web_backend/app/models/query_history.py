@@ -1,7 +1,7 @@
 """查詢歷史模型"""
 
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Integer, ForeignKey, Text, Float, JSON
+from sqlalchemy import String, Integer, ForeignKey, Text, Float, JSON, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -16,7 +16,13 @@ class QueryHistory(Base, TimestampMixin):
     """查詢歷史表"""
     
     __tablename__ = "query_history"
-    
+
+    # 統計查詢都以「處室 + 時間區間」過濾，
+    # 複合索引讓這類查詢不必掃整個處室的歷史
+    __table_args__ = (
+        Index('ix_query_history_dept_created', 'department_id', text('created_at DESC')),
+    )
+
     # 主鍵
     id: Mapped[int] = mapped_column(primary_key=True, comment="查詢歷史 ID")
     
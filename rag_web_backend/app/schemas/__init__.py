@@ -16,6 +16,15 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     """建立使用者請求"""
+    # 字元規則只限制新建帳號，不放在 UserBase：
+    # UserResponse 也繼承 UserBase，規則放在基底會讓既有帳號的讀取直接 500
+    username: str = Field(
+        ...,
+        min_length=3,
+        max_length=50,
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="使用者名稱（僅限英數字、底線與連字號）",
+    )
     password: str = Field(..., min_length=6, max_length=128, description="密碼")
     department_id: int = Field(..., description="所屬處室 ID")
 
@@ -53,6 +62,7 @@ class UserListResponse(BaseModel):
     page: int
     page_size: int
     pages: int
+    next_cursor: Optional[str] = Field(None, description="keyset 分頁的下一頁游標")
 
 
 class UserStatsResponse(BaseModel):
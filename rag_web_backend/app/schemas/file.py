@@ -1,6 +1,6 @@
 """檔案管理相關的 Pydantic Schemas"""
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -39,8 +39,7 @@ class FileUploadResponse(BaseModel):
     status: str
     message: str = "檔案上傳成功，正在處理中..."
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CategoryInfo(BaseModel):
@@ -49,8 +48,7 @@ class CategoryInfo(BaseModel):
     name: str
     color: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UploaderInfo(BaseModel):
@@ -59,8 +57,7 @@ class UploaderInfo(BaseModel):
     username: str
     full_name: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DepartmentInfo(BaseModel):
@@ -68,8 +65,7 @@ class DepartmentInfo(BaseModel):
     id: int
     name: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class FileSchema(BaseModel):
@@ -87,8 +83,37 @@ class FileSchema(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def from_orm_row(cls, f) -> "FileSchema":
+        """從已載入關聯的 ORM 列直接建構，跳過重複的欄位驗證
+
+        列表資料來自資料庫、型別已由 ORM 保證，
+        用 model_construct 省去每列一次完整 Pydantic 驗證的 CPU 開銷
+        """
+        return cls.model_construct(
+            id=f.id,
+            filename=f.filename,
+            original_filename=f.original_filename,
+            file_size=f.file_size,
+            file_type=f.file_type,
+            category=CategoryInfo.model_construct(
+                id=f.category.id,
+                name=f.category.name,
+                color=f.category.color
+            ) if f.category else None,
+            uploader=UploaderInfo.model_construct(
+                id=f.uploader.id,
+                username=f.uploader.username,
+                full_name=f.uploader.full_name
+            ),
+            status=f.status.value if hasattr(f.status, "value") else f.status,
+            is_vectorized=f.is_vectorized,
+            vector_count=f.vector_count,
+            created_at=f.created_at,
+            updated_at=f.updated_at,
+        )
 
 
 class FileDetailResponse(BaseModel):
@@ -111,8 +136,7 @@ class FileDetailResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class FileListResponse(BaseModel):
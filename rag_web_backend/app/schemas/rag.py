@@ -1,6 +1,6 @@
 """RAG 查詢相關的 Pydantic Schema"""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -12,14 +12,15 @@ class QueryRequest(BaseModel):
     scope_ids: Optional[List[int]] = Field(default=None, description="範圍限定 ID（第一個元素為 department_id）")
     category_ids: Optional[List[int]] = Field(default=None, description="分類 ID 列表（會自動包含「其他」分類）")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "query": "人事室的聯絡方式是什麼？",
                 "scope_ids": [1],
                 "category_ids": [1, 2, 3]
             }
         }
+    )
 
 
 class DocumentSource(BaseModel):
@@ -30,8 +31,8 @@ class DocumentSource(BaseModel):
     source_link: str = Field(default="", description="原始連結")
     download_link: str = Field(default="", description="下載連結")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "file_id": 123,
                 "file_name": "系統操作手冊.pdf",
@@ -39,6 +40,7 @@ class DocumentSource(BaseModel):
                 "download_link": "/api/files/123/download"
             }
         }
+    )
 
 
 class QueryResponse(BaseModel):
@@ -48,8 +50,8 @@ class QueryResponse(BaseModel):
     answer: str = Field(..., description="生成的答案")
     sources: List[DocumentSource] = Field(..., description="來源文檔")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "query": "什麼是資料隔離原則？",
                 "answer": "根據系統文檔，資料隔離原則是指每個處室的資料必須完全隔離...",
@@ -62,6 +64,5 @@ class QueryResponse(BaseModel):
                 ]
             }
         }
-
-
+    )
 
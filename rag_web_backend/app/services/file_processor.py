@@ -17,6 +17,8 @@ from app.services.document_processing import (
     EmbeddingProcessor
 )
 from app.services.llm.ollama_client import OllamaClient
+from app.services.rag.engine_cache import invalidate_engine
+from app.services.rag.query_cache import invalidate_query_cache
 
 
 class FileProcessingService:
@@ -93,6 +95,10 @@ class FileProcessingService:
                     results['success'] += 1
                     file_result['success'] = True
                     await db.commit()
+                    # 知識庫內容已變動，清除該處室的 RAG 查詢快取與引擎
+                    # （引擎持有已載入的向量索引，不清除會查不到新文件）
+                    invalidate_query_cache(file_record.department_id)
+                    invalidate_engine(file_record.department_id)
                 else:
                     # 處理失敗，_process_single_file 已經清理了檔案和資料庫記錄
                     results['failed'] += 1
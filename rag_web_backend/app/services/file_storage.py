@@ -90,15 +90,16 @@ class FileStorageService:
         # 檢查資料庫是否已有相同檔名基礎的檔案
         if db is not None and original_filename:
             base_name = original_filename.rsplit('.', 1)[0]
-            check_query = select(FileModel).where(
-                FileModel.department_id == department_id,
-                FileModel.original_filename.like(f"{base_name}.%")
+            # 只查檔名欄位（錯誤訊息用），不載入整個 File 實體
+            existing_name = await db.scalar(
+                select(FileModel.original_filename).where(
+                    FileModel.department_id == department_id,
+                    FileModel.original_filename.like(f"{base_name}.%")
+                ).limit(1)
             )
-            result = await db.execute(check_query)
-            existing_file = result.scalar_one_or_none()
-            
-            if existing_file:
-                raise ValueError(f"檔案「{existing_file.original_filename}」已存在，請先刪除舊檔或更改檔名後再上傳")
+
+            if existing_name:
+                raise ValueError(f"檔案「{existing_name}」已存在，請先刪除舊檔或更改檔名後再上傳")
         
         # 生成檔名
         unique_filename = self.generate_unique_filename(upload_file.filename)
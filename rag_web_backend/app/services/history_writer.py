@@ -0,0 +1,59 @@
+"""查詢歷史批次寫入器
+
+高 QPS 下每筆查詢各自 commit 一列的成本不小；
+這裡以模組層級的 asyncio.Queue 收集歷史列，
+背景任務每 200ms 醒來一次，把窗口內累積的列用單一
+executemany INSERT 寫入，寫入次數趨近於每批一次而非每筆一次
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import insert
+
+from app.core.database import AsyncSessionLocal
+from app.models.query_history import QueryHistory
+
+logger = logging.getLogger("app.history_writer")
+
+# 批次收集窗口（秒）
+_FLUSH_INTERVAL = 0.2
+
+_queue: asyncio.Queue = asyncio.Queue()
+_flusher_task: asyncio.Task = None
+
+
+def enqueue_history(row: dict) -> None:
+    """將一筆查詢歷史排入佇列（非阻塞），由背景任務批次寫入
+
+    參數:
+        row: 對應 QueryHistory 欄位的 dict
+    """
+    _ensure_flusher()
+    _queue.put_nowait(row)
+
+
+def _ensure_flusher() -> None:
+    """惰性啟動批次寫入任務（需在事件迴圈內呼叫）"""
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def _flush_loop() -> None:
+    """持續收集並批次寫入查詢歷史"""
+    while True:
+        # 等第一筆進來，再留一個短窗口收集同批的其他寫入
+        rows = [await _queue.get()]
+        await asyncio.sleep(_FLUSH_INTERVAL)
+        while not _queue.empty():
+            rows.append(_queue.get_nowait())
+
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(QueryHistory), rows)
+                await session.commit()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("查詢歷史批次寫入 %d 筆", len(rows))
+        except Exception:
+            logger.exception("查詢歷史批次寫入失敗 (%d 筆)", len(rows))
@@ -2,6 +2,8 @@
 Ollama 客戶端 - 用於 LLM 生成和嵌入（異步版本）
 """
 
+import json
+
 import httpx
 import opencc
 from app.config import settings
@@ -62,6 +64,49 @@ class OllamaClient:
         except KeyError:
             return "錯誤: 無效的響應格式"
     
+    async def generate_stream(self, prompt: str, timeout: int = 300):
+        """
+        異步以串流方式生成回應，逐段 yield 文字
+
+        參數:
+            prompt: 要發送到模型的提示詞
+            timeout: 請求超時時間（秒）
+
+        產出:
+            str: 模型回應的片段（已轉繁體），發生錯誤時 yield 錯誤訊息後結束
+        """
+        url = f"{self.base_url}/api/generate"
+
+        data = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True
+        }
+
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                async with client.stream("POST", url, json=data) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        piece = chunk.get("response", "")
+                        if piece:
+                            # 將簡體中文轉換為繁體中文
+                            yield self.converter.convert(piece)
+                        if chunk.get("done"):
+                            break
+
+        except httpx.ConnectError:
+            yield "錯誤: 無法連接到 Ollama 服務器。請確保 Ollama 正在運行"
+        except httpx.TimeoutException:
+            yield "錯誤: 請求超時"
+        except httpx.HTTPStatusError as e:
+            yield f"錯誤: HTTP {e.response.status_code}"
+        except Exception as e:
+            yield f"錯誤: {str(e)}"
+
     async def generate_embedding(self, text: str, model: str = None, timeout: int = 60) -> list[float] | None:
         """
         異步為文本生成嵌入向量
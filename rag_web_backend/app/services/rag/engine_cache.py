@@ -0,0 +1,57 @@
+"""各處室 RAG 引擎快取
+
+引擎初始化要從磁碟載入 embeddings，是整條查詢路徑最大的固定成本，
+改為每個處室惰性建立一次後重複使用，而非每次請求重建。
+
+失效有兩條路：
+- 本行程內：檔案重新向量化或刪除時呼叫 invalidate_engine 立即移除
+- 跨行程：uvicorn 多 worker 下，其他 worker 收不到失效呼叫，
+  改在快取命中時（最多每 _STALE_CHECK_INTERVAL 秒一次）
+  對 embeddings 目錄做 stat 檢查，索引已變動就重建引擎
+"""
+
+import asyncio
+import time
+
+from app.services.rag.rag_engine import RAGEngine
+
+_STALE_CHECK_INTERVAL = 5.0  # 秒
+
+# department_id -> (引擎, 下次過期檢查時間)
+_engine_cache: dict[int, tuple[RAGEngine, float]] = {}
+_engine_lock = asyncio.Lock()
+
+
+async def get_engine(department_id: int) -> RAGEngine:
+    """取得（必要時建立）指定處室的 RAG 引擎
+
+    以 asyncio.Lock 保護首次建立，
+    避免併發的第一批請求重複載入同一份索引
+    """
+    now = time.monotonic()
+    entry = _engine_cache.get(department_id)
+    if entry is not None:
+        engine, next_check = entry
+        if now < next_check:
+            return engine
+        if not engine.vector_store.is_stale():
+            _engine_cache[department_id] = (engine, now + _STALE_CHECK_INTERVAL)
+            return engine
+        # 其他行程已變更索引檔案，丟棄舊引擎走重建
+        _engine_cache.pop(department_id, None)
+
+    async with _engine_lock:
+        entry = _engine_cache.get(department_id)
+        if entry is None:
+            engine = RAGEngine(
+                base_path=f"uploads/{department_id}/processed",
+                debug_mode=True
+            )
+            _engine_cache[department_id] = (engine, now + _STALE_CHECK_INTERVAL)
+            return engine
+        return entry[0]
+
+
+def invalidate_engine(department_id: int) -> None:
+    """移除指定處室的引擎快取（檔案異動後呼叫），下次查詢重新載入索引"""
+    _engine_cache.pop(department_id, None)
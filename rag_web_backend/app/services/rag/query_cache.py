@@ -0,0 +1,76 @@
+"""RAG 查詢結果快取
+
+部門知識庫的查詢高度重複，而每次查詢都要走
+embedding + 檢索 + reranker + LLM 的完整流程。
+以（處室、正規化後的問題、檔名權限範圍）為鍵快取查詢結果，
+命中時完全跳過檢索與生成。
+
+快取存活一小時並以 LRU 限制筆數；
+檔案重新向量化或刪除時呼叫 invalidate_query_cache 清除對應處室的項目。
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+_CACHE_TTL = 3600  # 秒
+_CACHE_MAX_ENTRIES = 256
+
+# key -> (到期時間, 查詢結果)
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _make_key(
+    department_id: int,
+    query: str,
+    allowed_filenames: Optional[set]
+) -> tuple:
+    """建立快取鍵：問題做空白正規化，權限範圍取排序後的雜湊"""
+    normalized = " ".join(query.split()).lower()
+    scope = ""
+    if allowed_filenames:
+        scope = hashlib.sha1(
+            "\n".join(sorted(allowed_filenames)).encode("utf-8")
+        ).hexdigest()
+    return (department_id, normalized, scope)
+
+
+def get_cached_result(
+    department_id: int,
+    query: str,
+    allowed_filenames: Optional[set] = None
+) -> Optional[dict]:
+    """取得快取的查詢結果，無命中或已過期回傳 None"""
+    key = _make_key(department_id, query, allowed_filenames)
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def store_result(
+    department_id: int,
+    query: str,
+    allowed_filenames: Optional[set],
+    result: dict
+) -> None:
+    """寫入查詢結果，超出容量時淘汰最久未使用的項目"""
+    key = _make_key(department_id, query, allowed_filenames)
+    _cache[key] = (time.monotonic() + _CACHE_TTL, result)
+    _cache.move_to_end(key)
+    while len(_cache) > _CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+def invalidate_query_cache(department_id: Optional[int] = None) -> None:
+    """清除快取；指定處室時只清除該處室的項目"""
+    if department_id is None:
+        _cache.clear()
+        return
+    for key in [k for k in _cache if k[0] == department_id]:
+        del _cache[key]
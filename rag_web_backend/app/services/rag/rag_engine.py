@@ -73,8 +73,8 @@ class RAGEngine:
         
         return list(file_to_docs.values())
     
-    async def query(self, question: str, 
-              top_k: int = 250, 
+    async def query(self, question: str,
+              top_k: int = 50,
               include_similarity_scores: bool = False,
               allowed_filenames: set = None) -> Dict:
         """
@@ -159,18 +159,42 @@ class RAGEngine:
             logger.info("=" * 80)
         
         # 4. 整理結果（使用去重後的文檔）
+        sources = self._build_sources(deduplicated_docs, include_similarity_scores)
+
+        result = {
+            'question': question,
+            'answer': response,
+            'sources': sources,
+            'retrieved_docs': len(similar_docs),
+            'used_for_answer': len(top_docs)
+        }
+        
+        # 顯示結果
+        logger.info(f"\n=== 回答結果 ===")
+        logger.info(f"檢索 {len(similar_docs)} 個文檔，使用 Top {len(top_docs)} 生成回答")
+        logger.info(f"\n來源文檔:")
+        for i, source in enumerate(sources, 1):
+            if include_similarity_scores:
+                logger.info(f"  {i}. {source['filename']} (相似度: {source['similarity']:.4f}, Rerank: {source['score']:.4f})")
+            else:
+                logger.info(f"  {i}. {source['filename']}")
+        
+        return result
+    
+    def _build_sources(self, deduplicated_docs: List[Dict], include_similarity_scores: bool = False) -> List[Dict]:
+        """整理去重後文檔的來源資訊"""
         sources = []
         for doc_result in deduplicated_docs:
             doc_info = doc_result['document']
             filename = doc_info['filename']
             original_filename = doc_info.get('original_filename', filename)  # ✅ 優先使用 original_filename
-            
+
             # 動態載入路徑資訊
             doc_content = self.vector_store.get_document_content(filename)
             original_path = doc_content['original_path'] if doc_content else ''
             source_link = doc_content['source_link'] if doc_content else ''
             download_link = doc_content['download_link'] if doc_content else ''
-            
+
             source = {
                 'filename': original_filename,  # ✅ 使用原始檔名
                 'original_path': original_path,
@@ -181,27 +205,69 @@ class RAGEngine:
                 source['similarity'] = doc_result['similarity']
                 source['score'] = doc_result['score']
             sources.append(source)
-        
-        result = {
-            'question': question,
-            'answer': response,
-            'sources': sources,
-            'retrieved_docs': len(similar_docs),
-            'used_for_answer': len(top_docs)
+        return sources
+
+    async def query_stream(self, question: str,
+              top_k: int = 50,
+              allowed_filenames: set = None):
+        """
+        異步執行 RAG 查詢並以串流方式產出回答
+
+        檢索與 rerank 流程同 query()，差別在於答案由 LLM 串流逐段 yield，
+        讓呼叫端在第一個 token 產生時就能開始回應
+
+        產出:
+            dict 事件：{'type': 'answer', 'text': ...} 為答案片段，
+            最後一筆 {'type': 'done', 'sources': [...], 'retrieved_docs': N}
+        """
+        logger.info("\n=== RAG查詢 (串流) ===")
+        logger.info(f"問題: {question}")
+
+        # 1. 檢索相關文檔（異步）
+        similar_docs = await self.vector_store.search_similar(
+            query_text=question,
+            top_k=top_k,
+            similarity_threshold=self.similarity_threshold,
+            allowed_filenames=allowed_filenames
+        )
+
+        if not similar_docs:
+            yield {'type': 'answer', 'text': RAG_NO_RESULTS_PROMPT}
+            yield {'type': 'done', 'sources': [], 'retrieved_docs': 0}
+            return
+
+        # 準備候選文檔並進行 rerank
+        candidates = [{
+            'document': doc['document'],
+            'similarity': doc['similarity'],
+            'summary': self.vector_store.get_document_summary(doc['document']['filename']) or ''
+        } for doc in similar_docs]
+        reranked_docs = self.reranker.rerank(question, candidates, threshold=self.rerank_threshold)
+
+        if not reranked_docs:
+            logger.warning("Rerank 後沒有符合閾值的文檔，返回無結果")
+            yield {'type': 'answer', 'text': RAG_NO_RESULTS_PROMPT}
+            yield {'type': 'done', 'sources': [], 'retrieved_docs': len(similar_docs)}
+            return
+
+        # 2. 使用 top N 文檔構建上下文並去重
+        top_docs = reranked_docs[:self.max_context_docs]
+        deduplicated_docs = self._deduplicate_docs_by_file(top_docs)
+
+        # 3. 串流生成回答
+        context = self._build_context(deduplicated_docs)
+        prompt = RAG_ANSWER_PROMPT.format(query=question, context=context)
+
+        async for piece in self.client.generate_stream(prompt):
+            yield {'type': 'answer', 'text': piece}
+
+        # 4. 最後送出來源資訊
+        yield {
+            'type': 'done',
+            'sources': self._build_sources(deduplicated_docs, include_similarity_scores=True),
+            'retrieved_docs': len(similar_docs)
         }
-        
-        # 顯示結果
-        logger.info(f"\n=== 回答結果 ===")
-        logger.info(f"檢索 {len(similar_docs)} 個文檔，使用 Top {len(top_docs)} 生成回答")
-        logger.info(f"\n來源文檔:")
-        for i, source in enumerate(sources, 1):
-            if include_similarity_scores:
-                logger.info(f"  {i}. {source['filename']} (相似度: {source['similarity']:.4f}, Rerank: {source['score']:.4f})")
-            else:
-                logger.info(f"  {i}. {source['filename']}")
-        
-        return result
-    
+
     def _build_context(self, deduplicated_docs):
         """建立上下文字串（合併相同檔案的所有 chunks）"""
         context_parts = []
@@ -1,9 +1,17 @@
+import numpy as np
+import torch
+from collections import OrderedDict
 from sentence_transformers import CrossEncoder
 from typing import List
 import logging
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# (query, summary) 配對分數快取上限（LRU 淘汰）
+_SCORE_CACHE_MAX_ENTRIES = 8192
+
 
 class Reranker:
     """
@@ -14,7 +22,20 @@ class Reranker:
     def __init__(self, model_name: str = "BAAI/bge-reranker-v2-m3"):
         # 載入 CrossEncoder 模型
         logger.info(f"[Reranker] loading model: {model_name}")
-        self.model = CrossEncoder(model_name)
+        if torch.cuda.is_available():
+            # GPU 上以 FP16 推論：權重與活化值的頻寬減半，
+            # transformer 前向（rerank 的瓶頸）吞吐明顯提升
+            self.model = CrossEncoder(
+                model_name,
+                device="cuda",
+                model_kwargs={"torch_dtype": torch.float16}
+            )
+        else:
+            self.model = CrossEncoder(model_name)
+
+        # 同一 query 在重試或相近提問下會反覆對上相同的 summary，
+        # 以 (query, summary) 為鍵快取分數，命中時連 tokenize 帶前向推論一併省下
+        self._score_cache: OrderedDict = OrderedDict()
 
     def rerank(self, query: str, candidates: List[dict], threshold: float = None) -> List[dict]:
         """
@@ -35,31 +56,52 @@ class Reranker:
                 - summary (str): 文件摘要
                 - score (float): reranker 分數 (越高越相關)
         """
-        # 準備 (query, summary) 配對
-        pairs = [[query, c["summary"]] for c in candidates]
+        # 先查配對分數快取，只把未命中的 (query, summary) 送進模型，
+        # 避免同一 query 對相同 summary 重複 tokenize 與前向推論
+        scores = np.empty(len(candidates), dtype=np.float32)
+        miss_pairs = []
+        miss_indices = []
+        for i, c in enumerate(candidates):
+            cached = self._score_cache.get((query, c["summary"]))
+            if cached is not None:
+                self._score_cache.move_to_end((query, c["summary"]))
+                scores[i] = cached
+            else:
+                miss_pairs.append([query, c["summary"]])
+                miss_indices.append(i)
 
-        # 模型預測分數 (相關性分數，float，越高越相關)
-        scores = self.model.predict(pairs)
+        if miss_pairs:
+            # 模型預測分數 (相關性分數，float，越高越相關)
+            fresh_scores = self.model.predict(
+                miss_pairs,
+                batch_size=settings.RERANK_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            for i, score in zip(miss_indices, fresh_scores):
+                scores[i] = score
+                self._score_cache[(query, candidates[i]["summary"])] = float(score)
+            while len(self._score_cache) > _SCORE_CACHE_MAX_ENTRIES:
+                self._score_cache.popitem(last=False)
+
+        # 閾值過濾與排序都在 NumPy 端完成，
+        # 只對存活的索引建構結果 dict，被濾掉的候選完全不經手
+        if threshold is not None:
+            keep = np.flatnonzero(scores >= threshold)
+        else:
+            keep = np.arange(len(scores))
+        order = keep[np.argsort(-scores[keep])]
 
-        # 將分數加回 candidates
-        results = []
-        for c, s in zip(candidates, scores):
-            score = float(s)
-            # 如果設定了 threshold，過濾掉低分文檔
-            if threshold is not None and score < threshold:
-                continue
-            
-            item = {
-                "document": c["document"],
-                "similarity": c["similarity"],
-                "summary": c["summary"],
-                "score": score
+        results = [
+            {
+                "document": candidates[i]["document"],
+                "similarity": candidates[i]["similarity"],
+                "summary": candidates[i]["summary"],
+                "score": float(scores[i])
             }
-            results.append(item)
+            for i in order
+        ]
 
-        # 依照分數由高到低排序
-        results.sort(key=lambda x: x["score"], reverse=True)
-        
         if threshold is not None:
             logger.info(f"Rerank 過濾: {len(candidates)} → {len(results)} 個文檔 (閾值: {threshold})")
 
@@ -7,6 +7,9 @@ import os
 import json
 import logging
 from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
 from app.services.document_processing import EmbeddingProcessor
 
 logger = logging.getLogger(__name__)
@@ -28,31 +31,106 @@ class VectorStore:
         self.embeddings_path = os.path.join(base_path, "embeddings")
         self.summaries_path = os.path.join(base_path, "summaries")
         self.embedding_processor = EmbeddingProcessor()
-        
+
+        # 合併快取檔案：所有 embeddings 堆疊成單一 .npy（已 L2 正規化）
+        # 之後以 mmap 載入，多個 worker 行程共享同一份頁面，不必各自複製到 RAM
+        self._matrix_file = os.path.join(base_path, "embeddings_matrix.npy")
+        self._docs_file = os.path.join(base_path, "embeddings_docs.json")
+
         # 緩存數據
         self._embeddings_cache = None
         self._documents_cache = None
+        self._matrix_cache = None  # L2 正規化後的 embeddings 矩陣
+        self._loaded_files_stat = None  # 載入當下的 (檔案數, 最新 mtime)，供跨行程過期檢查
     
+    def _embedding_files_stat(self) -> Tuple[int, float]:
+        """統計 embeddings 目錄中的檔案數量與最新修改時間（只做 stat，不解析內容）"""
+        count = 0
+        latest_mtime = 0.0
+        for root, _, files in os.walk(self.embeddings_path):
+            for file in files:
+                if file.endswith('_embedding.json'):
+                    count += 1
+                    latest_mtime = max(latest_mtime, os.path.getmtime(os.path.join(root, file)))
+        return count, latest_mtime
+
+    def is_stale(self) -> bool:
+        """磁碟上的 embeddings 是否已與載入時不同
+
+        只做目錄 stat（數量 + 最新 mtime），不解析任何內容。
+        用於多 worker 部署：檔案異動只會通知處理它的行程，
+        其他行程靠這個檢查發現索引已過期
+        """
+        if self._loaded_files_stat is None:
+            return False
+        return self._loaded_files_stat != self._embedding_files_stat()
+
+    def _load_consolidated_cache(self) -> Optional[Tuple["np.ndarray", List[Dict]]]:
+        """嘗試以 mmap 載入合併快取；過期或不存在時返回 None"""
+        if not (os.path.exists(self._matrix_file) and os.path.exists(self._docs_file)):
+            return None
+        try:
+            cache_mtime = min(os.path.getmtime(self._matrix_file), os.path.getmtime(self._docs_file))
+            count, latest_mtime = self._embedding_files_stat()
+            matrix = np.load(self._matrix_file, mmap_mode="r")
+            with open(self._docs_file, 'r', encoding='utf-8') as f:
+                documents = json.load(f)
+            # 檔案新增/更新（mtime 變新）或刪除（數量變少）都會使快取失效
+            if latest_mtime > cache_mtime or count != len(documents) or len(matrix) != len(documents):
+                return None
+            return matrix, documents
+        except Exception as e:
+            logger.warning(f"合併快取載入失敗，改走逐檔載入: {str(e)}")
+            return None
+
+    def _save_consolidated_cache(self, matrix: "np.ndarray", documents: List[Dict]):
+        """原子性地寫出合併快取（先寫暫存檔再 rename，避免多 worker 互踩）"""
+        try:
+            # 暫存檔以 .npy 結尾，np.save 才不會再補副檔名
+            tmp_matrix = self._matrix_file + ".tmp.npy"
+            tmp_docs = self._docs_file + ".tmp"
+            np.save(tmp_matrix, matrix)
+            with open(tmp_docs, 'w', encoding='utf-8') as f:
+                json.dump(documents, f, ensure_ascii=False)
+            os.replace(tmp_matrix, self._matrix_file)
+            os.replace(tmp_docs, self._docs_file)
+        except Exception as e:
+            logger.warning(f"合併快取寫出失敗: {str(e)}")
+
     def load_embeddings(self) -> Tuple[List[List[float]], List[Dict]]:
         """
         加載embeddings和對應的文檔信息（從單一目錄）
-        
+
         返回:
             (embeddings列表, 文檔信息列表)
         """
         # 檢查緩存
         if self._embeddings_cache is not None and self._documents_cache is not None:
             return self._embeddings_cache, self._documents_cache
-        
+
         logger.info(f"正在從 {self.embeddings_path} 加載embeddings...")
-        
+
         embeddings = []
         documents = []
-        
+
         if not os.path.exists(self.embeddings_path):
             logger.warning(f"Embeddings目錄不存在: {self.embeddings_path}")
             return embeddings, documents
-        
+
+        # 記下載入當下的目錄狀態，is_stale 以此偵測其他行程的檔案異動
+        self._loaded_files_stat = self._embedding_files_stat()
+
+        # 優先走合併快取：mmap 不複製資料頁，
+        # 多個 uvicorn worker 可共享同一份矩陣，啟動也不用重新解析所有 JSON
+        cached = self._load_consolidated_cache()
+        if cached is not None:
+            matrix, documents = cached
+            self._matrix_cache = matrix
+            self._embeddings_cache = matrix
+            self._documents_cache = documents
+            logger.info(f"從合併快取 mmap 載入 {len(documents)} 個embeddings")
+            return self._embeddings_cache, self._documents_cache
+
         # 遍歷 embeddings 目錄中的所有文件
         for root, _, files in os.walk(self.embeddings_path):
             for file in files:
@@ -80,7 +158,17 @@ class VectorStore:
         # 緩存結果
         self._embeddings_cache = embeddings
         self._documents_cache = documents
-        
+
+        # 預先堆疊成 L2 正規化的矩陣，
+        # 檢索時一次矩陣乘法算完所有相似度，不需逐向量計算
+        if embeddings:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._matrix_cache = matrix / norms
+            # 寫出合併快取，供其他 worker 與下次啟動直接 mmap
+            self._save_consolidated_cache(self._matrix_cache, documents)
+
         logger.info(f"成功加載 {len(embeddings)} 個embeddings")
         return embeddings, documents
     
@@ -109,28 +197,47 @@ class VectorStore:
         
         # 載入所有 embeddings
         embeddings, documents = self.load_embeddings()
-        
-        if not embeddings:
+
+        # 可能是 list 或 mmap 的 ndarray，統一用長度判斷
+        if len(embeddings) == 0:
             logger.warning("沒有可搜索的embeddings")
             return []
         
-        # 計算相似度
+        # 權限過濾下推到計分之前：不在允許清單中的向量完全不參與計算，
+        # 其餘的以單一矩陣乘法一次算完相似度
+        if allowed_filenames is not None:
+            candidate_idx = [
+                i for i, doc in enumerate(documents)
+                if (doc.get('original_filename') or doc.get('filename')) in allowed_filenames
+            ]
+            if not candidate_idx:
+                logger.info("允許清單中沒有對應的向量")
+                return []
+        else:
+            candidate_idx = None
+
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            logger.error("查詢embedding為零向量")
+            return []
+        query_vec = query_vec / query_norm
+
+        if candidate_idx is not None:
+            scores = self._matrix_cache[candidate_idx] @ query_vec
+        else:
+            scores = self._matrix_cache @ query_vec
+
         similarities = []
-        for i, doc_embedding in enumerate(embeddings):
-            # 檢查檔案是否在允許清單中
-            doc_filename = documents[i].get('original_filename') or documents[i].get('filename')
-            if allowed_filenames is not None and doc_filename not in allowed_filenames:
-                continue  # 跳過不在允許清單中的檔案
-            
-            similarity = self.embedding_processor.cosine_similarity(query_embedding, doc_embedding)
-            
+        for pos, similarity in enumerate(scores):
             # 檢查相似度閾值
             if similarity >= similarity_threshold:
+                doc_idx = candidate_idx[pos] if candidate_idx is not None else pos
                 similarities.append({
-                    'document': documents[i],
-                    'similarity': similarity
+                    'document': documents[doc_idx],
+                    'similarity': float(similarity)
                 })
-        
+
         # 按相似度排序並返回top_k
         similarities.sort(key=lambda x: x['similarity'], reverse=True)
         results = similarities[:top_k]
@@ -205,6 +312,8 @@ class VectorStore:
         """
         self._embeddings_cache = None
         self._documents_cache = None
+        self._matrix_cache = None
+        self._loaded_files_stat = None
         logger.info("向量緩存已清除")
     
     def preload_all_caches(self):
@@ -223,16 +332,16 @@ class VectorStore:
             統計信息字典
         """
         embeddings, documents = self.load_embeddings()
-        
-        if not embeddings:
+
+        if len(embeddings) == 0:
             return {
                 'total_documents': 0,
                 'embedding_dimension': 0,
                 'storage_path': self.embeddings_path
             }
-        
+
         return {
             'total_documents': len(embeddings),
-            'embedding_dimension': len(embeddings[0]) if embeddings else 0,
+            'embedding_dimension': len(embeddings[0]),
             'storage_path': self.embeddings_path
         }